@@ -1,8 +1,7 @@
 """Parsing input data and generating formatted code output."""
 import sys
 from llvm import Llvm
-from scanner import Scanner
-from sympy import sympify
+from evaluator import Evaluator
 
 class CodeProcessor:
     """
@@ -18,13 +17,22 @@ class CodeProcessor:
     Parameters
     ----------
         scanner (Scanner): A scanner instance used for parsing input data.
+        reference (str): How `test_expression` computes the expected values:
+            'builtin' uses the `Evaluator`, 'sympy' imports sympy on first
+            use and evaluates the expressions with `sympify`.
     """
 
-    def __init__(self, scanner):
+    REFERENCES = ('builtin', 'sympy')
+
+    def __init__(self, scanner, reference='builtin'):
+        if reference not in self.REFERENCES:
+            raise ValueError(f'reference={reference} is invalid.')
         self.__scanner = scanner
         self.__file_m68k = None
         self.__file_llvm = None
         self.__llvm = Llvm()
+        self.__reference = reference
+        self.__evaluator = Evaluator()
 
     def set_m68k_code_output_file(self, file):
         """Set output file for M68k code."""
@@ -36,6 +44,21 @@ class CodeProcessor:
             self.__llvm = Llvm(enabled=True)
         self.__file_llvm = file
 
+    def get_llvm(self):
+        """Get the LLVM IR helper holding the SSA and string constant state."""
+        return self.__llvm
+
+    def set_llvm(self, llvm):
+        """Set the LLVM IR helper, e.g. one continuing from given counters."""
+        self.__llvm = llvm
+
+    def append_code(self, m68k_code, llvm_code):
+        """Append already generated code fragments to the output files."""
+        if self.__file_m68k:
+            self.__file_m68k.write(m68k_code)
+        if self.__file_llvm:
+            self.__file_llvm.write(llvm_code)
+
     def __close(self, file):
         if file is not None and file is not sys.stdout:
             file.close()
@@ -102,11 +125,10 @@ class CodeProcessor:
         self.factor()
         while self.__scanner.peek_char() in ('*', '/'):
             self.emit_ln_m68k('MOVE D0,-(SP)', 'decrement SP; (SP)=D0 (push)')
-            if self.__file_llvm:
-                ssa_stack = self.__llvm.push_new_llvm_variable_to_stack()
-                ssa = self.__llvm.last_ssa_variable()
-                self.emit_ln_llvm(f'{ssa_stack} = add i32 {ssa}, 0',
-                                  f'{ssa_stack} = {ssa}')
+            ssa_stack = self.__llvm.push_new_llvm_variable_to_stack()
+            ssa = self.__llvm.last_ssa_variable()
+            self.emit_ln_llvm(f'{ssa_stack} = add i32 {ssa}, 0',
+                              f'{ssa_stack} = {ssa}')
             match self.__scanner.peek_char():
                 case '*': self.multiply()
                 case '/': self.divide()
@@ -153,18 +175,45 @@ class CodeProcessor:
 
     def test_expression(self, exprs):
         """Generate compilable LLVM code for a list of expressions."""
+        self.test_expression_header()
+        self.test_expression_lines(exprs)
+        self.test_expression_footer()
+
+    def test_expression_header(self):
+        """Generate the start of the expression test program."""
         self.emit_ln_llvm(self.__llvm.LLVM_MAIN_HEADER, indent=0)
         self.emit_ln_llvm(self.__llvm.get_printf_statement(
             'counter;expected;current\n'))
-        count = 0
+
+    def test_expression_lines(self, exprs, count=0):
+        """
+        Generate the code of the expressions, numbered from `count` + 1.
+
+        Without an LLVM IR output file the expected values are not computed,
+        but the SSA counters and string constants are still updated when an
+        enabled `Llvm` helper has been set.
+        """
         for expr in exprs:
             count += 1
-            self.__scanner = Scanner(expr)
+            self.__scanner.reset(expr)
             self.expression()
-            expected = f'i32 {sympify(expr.replace("/", "//"))}'
+            if self.__file_llvm:
+                expected = f'i32 {self.expected_value(expr)}'
+            else:
+                expected = None
             current = f'i32 {self.__llvm.last_ssa_variable()}'
             self.emit_ln_llvm(self.__llvm.get_printf_statement(
                 '%d;%d;%d\n', f'i32 {count}', expected, current))
+
+    def expected_value(self, expr):
+        """Compute the expected value of an expression."""
+        if self.__reference == 'sympy':
+            from sympy import sympify
+            return sympify(expr.replace("/", "//"))
+        return self.__evaluator.evaluate(expr)
+
+    def test_expression_footer(self):
+        """Generate the end of the expression test program."""
         self.emit_ln_llvm(self.__llvm.LLVM_MAIN_RETURN, indent=0)
         self.emit_ln_llvm(self.__llvm.LLVM_USED_FUNCTIONS, indent=0)
         self.emit_ln_llvm(self.__llvm.llvm_declare_strings(), indent=0)
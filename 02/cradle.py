@@ -10,11 +10,14 @@ Created on Sun Dec 15, 2024
 
 @author: https://github.com/vargajb
 """
+import os
 import sys
+import mmap
 import traceback
 import argparse
 from scanner import Scanner
 from code_processor import CodeProcessor
+from parallel import test_expression_parallel
 
 def read_input(path):
     """
@@ -44,6 +47,43 @@ def read_input(path):
             print(f"Error reading file {path}.")
             raise
 
+def stream_input(path, use_mmap=False):
+    """
+    Stream the input file line by line without reading it into memory.
+
+    Parameters
+    ----------
+    path : str
+        The path to the input file.
+    use_mmap : bool
+        - If True, memory-maps the file and decodes one line at a time.
+        - If False, iterates over the lines of the file object.
+
+    Yields
+    ------
+    str
+        The input lines without line terminators.
+    """
+    print(f"Streaming input data from file: {path}")
+    try:
+        if use_mmap:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    # `readline` only breaks at LF, split at CR and CRLF
+                    # too, like the universal newlines of the text path.
+                    for chunk in iter(m.readline, b''):
+                        for line in chunk.splitlines():
+                            yield line.decode("utf-8")
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip('\n')
+    except IOError:
+        print(f"Error reading file {path}.")
+        raise
+
 def open_output(path):
     """
     Open the output destination (either a file or standard output).
@@ -76,18 +116,45 @@ if __name__ == "__main__":
                         help="output file or 'stdout' for M68000 code")
     parser.add_argument('--LLVM', type=str, dest='output_llvm',
                         help="output file or 'stdout' for LLVM IR code")
+    parser.add_argument('--stream', action='store_true',
+                        help='compile the input file line by line without '
+                        'reading it into memory')
+    parser.add_argument('--mmap', action='store_true',
+                        help='like --stream, but memory-map the input file')
+    parser.add_argument('--reference', choices=CodeProcessor.REFERENCES,
+                        default='builtin',
+                        help='evaluator computing the expected values: the '
+                        'built-in one or sympy, if installed '
+                        '(default: builtin)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes compiling chunks of '
+                        'the input in parallel (default: 1)')
     args = parser.parse_args()
     if not (args.output_M68k or args.output_llvm):
         parser.error("At least one of --M68k or --LLVM must be specified.")
+    streaming = args.stream or args.mmap
+    if streaming and args.input is None:
+        parser.error("--stream and --mmap require an input file.")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    if streaming and args.jobs > 1:
+        parser.error("--jobs cannot be combined with --stream or --mmap.")
     try:
-        input_data = read_input(args.input)
-        scanner = Scanner(input_data)
-        code_proc = CodeProcessor(scanner)
+        if streaming:
+            lines = stream_input(args.input, use_mmap=args.mmap)
+        else:
+            lines = read_input(args.input).splitlines()
+        code_proc = CodeProcessor(Scanner(''), args.reference)
         if args.output_M68k:
             code_proc.set_m68k_code_output_file(open_output(args.output_M68k))
         if args.output_llvm:
             code_proc.set_llvm_code_output_file(open_output(args.output_llvm))
-        code_proc.test_expression(input_data.splitlines())
+        if args.jobs > 1:
+            test_expression_parallel(code_proc, lines, args.jobs,
+                                     bool(args.output_M68k),
+                                     bool(args.output_llvm), args.reference)
+        else:
+            code_proc.test_expression(lines)
         code_proc.close()
     except Exception as e:
         print(f"### Error: {e}")
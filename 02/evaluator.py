@@ -0,0 +1,58 @@
+"""Evaluating expressions to compute the expected results of the tests."""
+from scanner import Scanner
+
+class Evaluator:
+    """
+    A value-returning recursive-descent evaluator of expressions.
+
+    It parses expressions with the same grammar as `CodeProcessor`, so a
+    leading sign applies to the whole first term, and divides with Python's
+    `//` operator, which rounds to negative infinity like `@floor_div`.
+    """
+
+    def __init__(self):
+        self.__scanner = Scanner('')
+
+    def evaluate(self, expr):
+        """Return the value of the expression."""
+        self.__scanner.reset(expr)
+        return self.expression()
+
+    def factor(self):
+        """Evaluate a Math Factor."""
+        if self.__scanner.peek_char() == '(':
+            self.__scanner.match('(')
+            value = self.expression()
+            self.__scanner.match(')')
+        else:
+            value = int(self.__scanner.get_num())
+        return value
+
+    def term(self):
+        """Evaluate a Math Term."""
+        value = self.factor()
+        while self.__scanner.peek_char() in ('*', '/'):
+            match self.__scanner.peek_char():
+                case '*':
+                    self.__scanner.match('*')
+                    value *= self.factor()
+                case '/':
+                    self.__scanner.match('/')
+                    value //= self.factor()
+        return value
+
+    def expression(self):
+        """Evaluate an Expression."""
+        if self.__scanner.peek_char() in ('+', '-'):
+            value = 0
+        else:
+            value = self.term()
+        while self.__scanner.peek_char() in ('+', '-'):
+            match self.__scanner.peek_char():
+                case '+':
+                    self.__scanner.match('+')
+                    value += self.term()
+                case '-':
+                    self.__scanner.match('-')
+                    value -= self.term()
+        return value
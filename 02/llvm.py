@@ -23,14 +23,41 @@ Methods
   constants.
 """
 class Llvm:
-    """Helper class to generate LLVM IR code."""
+    """
+    Helper class to generate LLVM IR code.
+
+    All SSA counters, the SSA stack and the string constants are kept per
+    instance, so every compilation starts from a clean state. A compilation
+    can also continue from given counters and string constants, and a
+    namespace keeps the SSA names of chunks of a program that are compiled
+    separately apart, e.g. `%ssa_3_0` instead of `%ssa_0` for namespace '3_'.
+
+    Parameters
+    ----------
+        enabled (bool): Whether code is generated at all.
+        ssa_variable_counters (dict): The last counter of each SSA prefix.
+        string_constants (iterable): Already declared string constants.
+        namespace (str): Inserted between the prefix and the counter of the
+            SSA names.
+    """
+
+    def __init__(self, enabled=False, ssa_variable_counters=None,
+                 string_constants=(), namespace=''):
+        self.__disabled = not enabled
+        self.__namespace = namespace
+        self.__ssa_variable_counters = dict(ssa_variable_counters or {})
+        self.__ssa_variable_stack = list()
+        self.__string_constants = dict()
+        for s in string_constants:
+            self.add_string_constant(s)
 
-    __disabled = True
-    __ssa_variable_counters = dict()
-    __ssa_variable_stack = list()
+    def get_ssa_variable_counters(self):
+        """Return a copy of the last counter of each SSA prefix."""
+        return dict(self.__ssa_variable_counters)
 
-    def __init__(self, enabled=False):
-        self.__disabled = not enabled
+    def get_string_constants(self):
+        """Return the string constants in order of declaration."""
+        return list(self.__string_constants)
 
     def new_ssa_variable(self, prefix='ssa'):
         """Create a new SSA variable with the specified prefix."""
@@ -47,7 +74,7 @@ class Llvm:
         counter = self.__ssa_variable_counters.get(prefix)
         if counter is None:
             raise ValueError(f'prefix={prefix} is invalid.')
-        return f'%{prefix}_{counter}'
+        return f'%{prefix}_{self.__namespace}{counter}'
 
     def push_new_llvm_variable_to_stack(self):
         """
@@ -76,12 +103,15 @@ class Llvm:
                 self.new_ssa_variable(),
                 self.pop_llvm_variable_from_stack())
 
-    __string_constants = dict()
-    def get_printf_statement(self, s, *args):
-        """Generate an LLVM IR `printf` statement."""
+    def add_string_constant(self, s):
+        """Declare a string constant (once) and return its name."""
         if s not in self.__string_constants:
             self.__string_constants[s] = f'@str_{len(self.__string_constants)}'
-        str = self.__string_constants[s]
+        return self.__string_constants[s]
+
+    def get_printf_statement(self, s, *args):
+        """Generate an LLVM IR `printf` statement."""
+        str = self.add_string_constant(s)
         length = len(s) + 1
         result = 'call i32 (i8*, ...) @printf(i8* getelementptr ' \
             f'inbounds([{length} x i8], [{length} x i8]* {str}, i32 0, i32 0)'
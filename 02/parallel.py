@@ -0,0 +1,87 @@
+"""
+Compiling large expression corpora on several processes.
+
+The expressions are split into chunks that are compiled in a
+`ProcessPoolExecutor`, every expression exactly once. The SSA names of a
+chunk are qualified by the number of the chunk's first expression, e.g.
+`%ssa_300_0`, so the names of different chunks never collide and no chunk
+has to know how many names the chunks before it use. Each chunk declares
+its own string constants from `@str_0` on.
+
+The fragments are appended in input order. While merging, the string
+constants of every chunk are added to the deduplicated table of the whole
+program and the `@str_N` references of its LLVM IR are renumbered to match.
+Apart from the SSA names, the output is identical to a serial compilation.
+"""
+import io
+import re
+from concurrent.futures import ProcessPoolExecutor
+from llvm import Llvm
+from scanner import Scanner
+from code_processor import CodeProcessor
+
+STRING_PATTERN = re.compile(r'@str_(\d+)\b')
+
+
+def split_chunks(exprs, chunks):
+    """Split the list of expressions into at most `chunks` slices."""
+    size = max(-(-len(exprs) // chunks), 1)
+    return [exprs[i:i + size] for i in range(0, len(exprs), size)]
+
+
+def compile_chunk(exprs, count, m68k, llvm, reference):
+    """
+    Compile the chunk with its SSA names qualified by `count`.
+
+    Returns the M68k code and LLVM IR code fragments and the string constants
+    of the chunk in order of declaration.
+    """
+    file_m68k = io.StringIO() if m68k else None
+    file_llvm = io.StringIO() if llvm else None
+    code_proc = CodeProcessor(Scanner(''), reference)
+    code_proc.set_m68k_code_output_file(file_m68k)
+    code_proc.set_llvm_code_output_file(file_llvm)
+    chunk_llvm = Llvm(llvm, namespace=f'{count}_')
+    code_proc.set_llvm(chunk_llvm)
+    code_proc.test_expression_lines(exprs, count)
+    return (file_m68k.getvalue() if m68k else '',
+            file_llvm.getvalue() if llvm else '',
+            chunk_llvm.get_string_constants())
+
+
+def test_expression_parallel(code_proc, exprs, jobs, m68k, llvm,
+                             reference='builtin'):
+    """
+    Generate the same code as `CodeProcessor.test_expression` with `jobs`
+    worker processes, up to the names of the SSA variables.
+
+    Parameters
+    ----------
+    code_proc : CodeProcessor
+        The code processor writing to the output files.
+    exprs : list of str
+        The expressions, one per line.
+    jobs : int
+        The number of worker processes.
+    m68k, llvm : bool
+        Which output files have been set on `code_proc`.
+    reference : str
+        How the expected values are computed, see `CodeProcessor`.
+    """
+    chunks = split_chunks(list(exprs), jobs * 4)
+    counts = [0]
+    for chunk in chunks[:-1]:
+        counts.append(counts[-1] + len(chunk))
+    code_proc.test_expression_header()
+    header = code_proc.get_llvm()
+    with ProcessPoolExecutor(jobs) as executor:
+        fragments = executor.map(compile_chunk, chunks, counts,
+                                 [m68k] * len(chunks), [llvm] * len(chunks),
+                                 [reference] * len(chunks))
+        for (m68k_code, llvm_code, chunk_strings) in fragments:
+            strings = [header.add_string_constant(s) for s in chunk_strings]
+            if strings != [f'@str_{i}' for i in range(len(strings))]:
+                llvm_code = STRING_PATTERN.sub(
+                    lambda match: strings[int(match.group(1))], llvm_code)
+            code_proc.append_code(m68k_code, llvm_code)
+    code_proc.test_expression_footer()
@@ -18,8 +18,12 @@ class Scanner:
     """
 
     def __init__(self, input_data):
+        self.reset(input_data)
+
+    def reset(self, input_data, offset=0):
+        """Restart scanning of new input data at the given offset."""
         self.__input_data = input_data
-        self.__input_data_pos = -1
+        self.__input_data_pos = offset - 1
         self.next_char()
 
     def peek_char(self):
@@ -0,0 +1,631 @@
+"""
+Code generation backends driven by the parser.
+
+The parser reports every parse action (a number was loaded, a term was
+pushed, an add was recognized, ...) to the backends selected for output.
+Each backend translates the actions into code for its target and writes it
+through its own `Emitter`. Targets without an output file have no backend at
+all, so they cost nothing while parsing.
+
+Classes
+-------
+- Backend: The interface of the parse actions, doing nothing.
+- M68kBackend: Generates Motorola 68000 assembly code.
+- OptimizingM68kBackend: Generates optimized Motorola 68000 assembly code.
+- LlvmBackend: Generates LLVM IR code.
+- OptimizingLlvmBackend: Generates optimized LLVM IR code.
+"""
+from llvm import Llvm
+from strength import multiply_plan, divide_plan
+from value_range import FULL_RANGE, combine, same_sign, wrap_i32
+
+class Backend:
+    """
+    Base class of the code generation backends.
+
+    Every method corresponds to one parse action and does nothing here.
+
+    Parameters
+    ----------
+        emitter (Emitter): The emitter the generated code is written to.
+    """
+
+    def __init__(self, emitter):
+        self.emitter = emitter
+
+    def emit_ln(self, s, comment='', indent=1):
+        """Output a string with newline."""
+        self.emitter.emit_ln(s, comment, indent)
+
+    def flush(self):
+        """Write buffered code to the output file."""
+        self.emitter.flush()
+
+    def close(self):
+        """Flush buffered code and close the output file."""
+        self.emitter.close()
+
+    def load_number(self, num):
+        """Load a number into the primary register."""
+
+    def load_variable(self, name):
+        """Load a variable into the primary register."""
+
+    def call_function(self, name):
+        """Call a function, its result is in the primary register."""
+
+    def clear(self):
+        """Clear the primary register (leading unary sign)."""
+
+    def push_factor(self):
+        """Push the primary register before a mulop."""
+
+    def push_term(self):
+        """Push the primary register before an addop."""
+
+    def multiply(self):
+        """Multiply the popped value by the primary register."""
+
+    def divide(self):
+        """Divide the popped value by the primary register."""
+
+    def add(self):
+        """Add the primary register to the popped value."""
+
+    def subtract(self):
+        """Subtract the primary register from the popped value."""
+
+    def store_variable(self, name):
+        """Store the primary register into a variable."""
+
+    def begin_program(self):
+        """Start the test program."""
+
+    def print_variable(self, name):
+        """Print the value of a variable in the test program."""
+
+    def end_program(self):
+        """Finish the test program."""
+
+    def report(self):
+        """Return a summary of the applied optimizations, or None."""
+        return None
+
+
+class M68kBackend(Backend):
+    """Backend generating Motorola 68000 assembly code."""
+
+    def __init__(self, emitter):
+        super().__init__(emitter)
+        self.labels = 0
+
+    def new_label(self, prefix):
+        """Return a new label starting with `prefix`."""
+        self.labels += 1
+        return f'{prefix}_{self.labels}'
+
+    def load_number(self, num):
+        self.emit_ln(f'MOVE #{num}, D0', f'D0 = {num}')
+
+    def load_variable(self, name):
+        self.emit_ln(f'MOVE {name}(PC), D0', f'D0 = {name}')
+
+    def call_function(self, name):
+        self.emit_ln(f'BSR {name}', f'call {name}()')
+
+    def clear(self):
+        self.emit_ln('CLR D0', 'Clear D0 (set to 0)')
+
+    def push_factor(self):
+        self.emit_ln('MOVE D0,-(SP)', 'decrement SP; (SP)=D0 (push)')
+
+    def push_term(self):
+        self.emit_ln('MOVE D0,-(SP)', 'push D0 onto stack')
+
+    def multiply(self):
+        self.emit_ln('MULS (SP)+,D0', 'D0 *= (SP); increment SP (pop)')
+
+    def divide(self):
+        self.emit_ln('MOVE D0,D1', 'D1 = D0 (divisor)')
+        self.emit_ln('MOVE (SP)+,D0', 'D0 = (SP); increment SP (pop)')
+        self.emit_ln('EXT.L D0', 'Sign-extend the value in D0 to 32 bits')
+        emit_floor_division(self, 'D1', 'D0')
+
+    def add(self):
+        self.emit_ln('ADD (SP)+,D0', 'D0 += (SP); increment SP (pop)')
+
+    def subtract(self):
+        self.emit_ln('SUB (SP)+,D0', 'D0 -= (SP); increment SP (pop)')
+        self.emit_ln('NEG D0', 'D0 = -D0 (negate)')
+
+    def store_variable(self, name):
+        self.emit_ln(f'LEA {name}(PC),A0', f'A0 = addr({name})')
+        self.emit_ln('MOVE D0,(A0)', f'{name} = D0')
+
+
+class OptimizingM68kBackend(M68kBackend):
+    """
+    Backend generating optimized Motorola 68000 assembly code.
+
+    With 'strength-reduction' a loaded number is kept pending instead of
+    being moved into D0 right away. If the next action multiplies or divides
+    by it, the popped operand is shifted and added instead of using the slow
+    `MULS`/`DIVS`; any other action loads the pending number first. The
+    68000 has no 32x32 bit multiply, so divisions by constants other than
+    powers of two still use `DIVS`. Like the stack code, the shifts and adds
+    work on words; the high word of D0 is undefined.
+
+    The push of the left operand before a mulop is deferred as well: a
+    reduced operation works on the operand still in D0, so neither the push
+    nor the pop is emitted. Any other action pushes it first.
+
+    Parameters
+    ----------
+        emitter (Emitter): The emitter the generated code is written to.
+        optimizations (iterable): Names of the optimizations to apply, see
+            `M68K_OPTIMIZATIONS`.
+    """
+
+    def __init__(self, emitter, optimizations=()):
+        super().__init__(emitter)
+        self.optimizations = frozenset(optimizations)
+        self.strength_reduction = 'strength-reduction' in self.optimizations
+        self.pending = None
+        self.pushed = False
+
+    def push_pending(self):
+        """Emit the deferred push of the left operand of a mulop."""
+        if self.pushed:
+            super().push_factor()
+            self.pushed = False
+
+    def load_pending(self):
+        """Move the pending number into D0."""
+        self.push_pending()
+        if self.pending is not None:
+            super().load_number(self.pending)
+            self.pending = None
+
+    def load_number(self, num):
+        if self.strength_reduction:
+            self.pending = num
+        else:
+            super().load_number(num)
+
+    def load_variable(self, name):
+        self.pending = None
+        self.push_pending()
+        super().load_variable(name)
+
+    def call_function(self, name):
+        self.pending = None
+        self.push_pending()
+        super().call_function(name)
+
+    def clear(self):
+        self.pending = None
+        self.push_pending()
+        super().clear()
+
+    def push_factor(self):
+        self.load_pending()
+        if self.strength_reduction:
+            self.pushed = True
+        else:
+            super().push_factor()
+
+    def push_term(self):
+        self.load_pending()
+        super().push_term()
+
+    def shift(self, instruction, count, register='D0'):
+        """Shift a register, counts above 8 need a count register."""
+        operator = '<<=' if instruction == 'ASL' else '>>='
+        comment = f'{register} {operator} {count}'
+        if count <= 8:
+            self.emit_ln(f'{instruction} #{count},{register}', comment)
+        else:
+            self.emit_ln(f'MOVE #{count},D2', f'D2 = {count}')
+            self.emit_ln(f'{instruction} D2,{register}', comment)
+
+    def pop_operand(self):
+        """Pop the left operand of a reduced operation into D0."""
+        if self.pushed:
+            self.pushed = False
+        else:
+            self.emit_ln('MOVE (SP)+,D0', 'D0 = (SP); increment SP (pop)')
+
+    def multiply(self):
+        plan = None
+        if self.pending is not None:
+            plan = multiply_plan(int(self.pending))
+        if plan is None:
+            self.load_pending()
+            super().multiply()
+            return
+        self.pending = None
+        self.pop_operand()
+        match plan:
+            case ('zero',): self.emit_ln('MOVEQ #0,D0', 'D0 *= 0')
+            case ('shift', _, k): self.shift('ASL', k)
+            case ('shift-add' | 'shift-sub', _, a, b):
+                self.emit_ln('MOVE D0,D1', 'D1 = D0')
+                self.shift('ASL', a)
+                if b:
+                    self.shift('ASL', b, 'D1')
+                if plan[0] == 'shift-add':
+                    self.emit_ln('ADD D1,D0', 'D0 += D1')
+                else:
+                    self.emit_ln('SUB D1,D0', 'D0 -= D1')
+        if plan[0] != 'zero' and plan[1]:
+            self.emit_ln('NEG D0', 'D0 = -D0 (negate)')
+
+    def divide(self):
+        plan = None
+        if self.pending is not None:
+            plan = divide_plan(int(self.pending))
+        if plan is None or plan[0] == 'magic':
+            self.load_pending()
+            super().divide()
+            return
+        self.pending = None
+        self.pop_operand()
+        if plan[0] == 'shift':
+            self.shift('ASR', plan[1])
+
+    def add(self):
+        self.load_pending()
+        super().add()
+
+    def subtract(self):
+        self.load_pending()
+        super().subtract()
+
+    def store_variable(self, name):
+        self.load_pending()
+        super().store_variable(name)
+
+
+class LlvmBackend(Backend):
+    """Backend generating LLVM IR code, the primary register is an SSA."""
+
+    def __init__(self, emitter):
+        super().__init__(emitter)
+        self.llvm = Llvm(enabled=True)
+        self.allocated = set()
+
+    def load_number(self, num):
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = add i32 {num}, 0', f'{ssa} = {num}')
+
+    def load_variable(self, name):
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = load i32, i32* %{name}', f'{ssa} = {name}')
+
+    def call_function(self, name):
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = call i32 {name}()')
+
+    def clear(self):
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = add i32 0, 0')
+
+    def push_factor(self):
+        ssa_stack = self.llvm.push_new_llvm_variable_to_stack()
+        ssa = self.llvm.last_ssa_variable()
+        self.emit_ln(f'{ssa_stack} = add i32 {ssa}, 0', f'{ssa_stack} = {ssa}')
+
+    def push_term(self):
+        ssa = self.llvm.last_ssa_variable()
+        stack_ssa = self.llvm.push_new_llvm_variable_to_stack()
+        self.emit_ln(f'{stack_ssa} = add i32 {ssa}, 0')
+
+    def multiply(self):
+        (last_ssa, new_ssa, stack_ssa) = self.llvm.get_last_new_and_pop_ssa()
+        self.emit_ln(f'{new_ssa} = mul i32 {stack_ssa}, {last_ssa}')
+
+    def divide(self):
+        (op2, ssa, op1) = self.llvm.get_last_new_and_pop_ssa()
+        self.emit_ln(f'{ssa} = call i32 @floor_div(i32 {op1}, i32 {op2})')
+
+    def add(self):
+        (last_ssa, new_ssa, stack_ssa) = self.llvm.get_last_new_and_pop_ssa()
+        self.emit_ln(f'{new_ssa} = add i32 {stack_ssa}, {last_ssa}')
+
+    def subtract(self):
+        (last_ssa, new_ssa, stack_ssa) = self.llvm.get_last_new_and_pop_ssa()
+        self.emit_ln(f'{new_ssa} = sub i32 {stack_ssa}, {last_ssa}')
+
+    def store_variable(self, name):
+        last_ssa = self.llvm.last_ssa_variable()
+        self.allocate_variable(name)
+        self.emit_ln(f'store i32 {last_ssa}, i32* %{name}',
+                     f'{name} = {last_ssa}')
+
+    def allocate_variable(self, name):
+        """Allocate a variable once, when it is assigned the first time."""
+        if name not in self.allocated:
+            self.allocated.add(name)
+            self.emit_ln(f'%{name} = alloca i32', f'int {name}')
+
+    def begin_program(self):
+        self.emit_ln(self.llvm.LLVM_MAIN_HEADER, indent=0)
+
+    def print_variable(self, name):
+        new_ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{new_ssa} = load i32, i32* %{name}')
+        self.emit_ln(self.llvm.get_printf_statement(
+            f'{name} = %d\n', f'i32 {new_ssa}'))
+
+    def end_program(self):
+        self.emit_ln(self.llvm.LLVM_MAIN_RETURN, indent=0)
+        self.emit_ln(self.llvm.LLVM_USED_FUNCTIONS, indent=0)
+        self.emit_ln(self.llvm.llvm_declare_strings(), indent=0)
+
+
+class OptimizingLlvmBackend(LlvmBackend):
+    """
+    Backend generating optimized LLVM IR code.
+
+    The primary register and the stack are kept as operands, i.e. literals
+    or SSA variables, inside the compiler (copy propagation). Loading a
+    number and pushing a value emit no instructions, and the operations
+    refer to the literals and SSA variables directly, so the virtual stack
+    costs no IR at all.
+
+    With 'mem2reg' the variables are promoted to pure SSA values as well:
+    the current operand of every variable is kept in a map, so assignments
+    need no alloca/store and reads need no load. Variables read before their
+    first assignment are 0.
+
+    With 'value-numbering' every operation is looked up by its instruction
+    and operands (commutative operands sorted) before it is emitted, and a
+    repeated operation reuses the SSA variable computed earlier. Loaded
+    variables are remembered until the next store to them, which forwards the
+    stored value instead. `main` is a single basic block, so both tables are
+    valid across statements.
+
+    With 'strength-reduction' multiplications and floor divisions by
+    literals are replaced by shifts, adds and multiply-high sequences, see
+    the `strength` module.
+
+    With 'value-ranges' the range of every operand is tracked through the
+    operations and assignments, see the `value_range` module. Floor
+    divisions whose operands provably have the same sign need no correction
+    and are emitted as a plain `udiv` or `sdiv`.
+
+    Parameters
+    ----------
+        emitter (Emitter): The emitter the generated code is written to.
+        optimizations (iterable): Names of the optimizations to apply on top
+            of copy propagation, see `LLVM_OPTIMIZATIONS`.
+    """
+
+    def __init__(self, emitter, optimizations=()):
+        super().__init__(emitter)
+        self.optimizations = frozenset(optimizations)
+        self.mem2reg = 'mem2reg' in self.optimizations
+        self.value_numbering = 'value-numbering' in self.optimizations
+        self.strength_reduction = 'strength-reduction' in self.optimizations
+        self.value_ranges = 'value-ranges' in self.optimizations
+        self.primary = None
+        self.stack = []
+        self.variables = {}
+        self.values = {}
+        self.loaded = {}
+        self.ranges = {}
+        self.variable_ranges = {}
+        self.divisions = 0
+        self.simplified_divisions = 0
+
+    def load_number(self, num):
+        self.primary = num
+
+    def load_variable(self, name):
+        if self.mem2reg:
+            self.primary = self.variables.get(name, '0')
+            return
+        if self.value_numbering and name in self.loaded:
+            self.primary = self.loaded[name]
+            return
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = load i32, i32* %{name}', f'{ssa} = {name}')
+        self.primary = ssa
+        if self.value_numbering:
+            self.loaded[name] = ssa
+        if self.value_ranges:
+            self.ranges[ssa] = self.variable_ranges.get(name, FULL_RANGE)
+
+    def call_function(self, name):
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = call i32 {name}()')
+        self.primary = ssa
+
+    def clear(self):
+        self.primary = '0'
+
+    def push_factor(self):
+        self.stack.append(self.primary)
+
+    def push_term(self):
+        self.stack.append(self.primary)
+
+    def binary_operation(self, instruction):
+        """Combine the popped operand with the primary one."""
+        op1 = self.stack.pop()
+        op2 = self.primary
+        if self.value_numbering:
+            if instruction in ('add', 'mul'):
+                key = (instruction, *sorted((op1, op2)))
+            else:
+                key = (instruction, op1, op2)
+            if key in self.values:
+                self.primary = self.values[key]
+                return
+        ssa = None
+        if self.strength_reduction:
+            ssa = self.reduce_strength(instruction, op1, op2)
+        if self.value_ranges:
+            ranges = (self.range_of(op1), self.range_of(op2))
+            if instruction == 'floor_div' and ssa is None:
+                self.divisions += 1
+                division = same_sign(*ranges)
+                if division is not None:
+                    self.simplified_divisions += 1
+                    ssa = self.emit_operation(f'{division} i32 {op1}, {op2}')
+        if ssa is None:
+            ssa = self.llvm.new_ssa_variable()
+            if instruction == 'floor_div':
+                self.emit_ln(
+                    f'{ssa} = call i32 @floor_div(i32 {op1}, i32 {op2})')
+            else:
+                self.emit_ln(f'{ssa} = {instruction} i32 {op1}, {op2}')
+        self.primary = ssa
+        if self.value_numbering:
+            self.values[key] = ssa
+        if self.value_ranges and literal_value(ssa) is None:
+            self.ranges[ssa] = combine(OPERATORS[instruction], *ranges)
+
+    def range_of(self, operand):
+        """Return the value range of an operand."""
+        value = literal_value(operand)
+        if value is not None:
+            return (value, value)
+        return self.ranges.get(operand, FULL_RANGE)
+
+    def emit_operation(self, operation):
+        """Emit `<ssa> = operation` and return the new SSA variable."""
+        ssa = self.llvm.new_ssa_variable()
+        self.emit_ln(f'{ssa} = {operation}')
+        return ssa
+
+    def reduce_strength(self, instruction, op1, op2):
+        """
+        Emit a cheaper sequence for a multiplication or floor division by a
+        literal and return the operand holding the result, or None.
+        """
+        if instruction == 'mul':
+            if literal_value(op2) is None:
+                (op1, op2) = (op2, op1)
+            constant = literal_value(op2)
+            plan = multiply_plan(constant) if constant is not None else None
+            if plan is None:
+                return None
+            match plan:
+                case ('zero',): return '0'
+                case ('copy', _): result = op1
+                case ('shift', _, k):
+                    result = self.emit_operation(f'shl i32 {op1}, {k}')
+                case ('shift-add' | 'shift-sub', _, a, b):
+                    high = self.emit_operation(f'shl i32 {op1}, {a}')
+                    low = self.emit_operation(f'shl i32 {op1}, {b}') \
+                        if b else op1
+                    op = 'add' if plan[0] == 'shift-add' else 'sub'
+                    result = self.emit_operation(f'{op} i32 {high}, {low}')
+            if plan[1]:
+                result = self.emit_operation(f'sub i32 0, {result}')
+            return result
+        if instruction == 'floor_div':
+            divisor = literal_value(op2)
+            plan = divide_plan(divisor) if divisor is not None else None
+            match plan:
+                case ('copy',): return op1
+                case ('shift', k):
+                    return self.emit_operation(f'ashr i32 {op1}, {k}')
+                case ('magic', multiplier, shift):
+                    sign = self.emit_operation(f'ashr i32 {op1}, 31')
+                    folded = self.emit_operation(f'xor i32 {op1}, {sign}')
+                    wide = self.emit_operation(f'zext i32 {folded} to i64')
+                    product = self.emit_operation(
+                        f'mul i64 {wide}, {multiplier}')
+                    high = self.emit_operation(f'lshr i64 {product}, {shift}')
+                    quotient = self.emit_operation(f'trunc i64 {high} to i32')
+                    return self.emit_operation(f'xor i32 {quotient}, {sign}')
+        return None
+
+    def multiply(self):
+        self.binary_operation('mul')
+
+    def divide(self):
+        self.binary_operation('floor_div')
+
+    def add(self):
+        self.binary_operation('add')
+
+    def subtract(self):
+        self.binary_operation('sub')
+
+    def store_variable(self, name):
+        if self.mem2reg:
+            self.variables[name] = self.primary
+            return
+        self.allocate_variable(name)
+        self.emit_ln(f'store i32 {self.primary}, i32* %{name}',
+                     f'{name} = {self.primary}')
+        if self.value_numbering:
+            self.loaded[name] = self.primary
+        if self.value_ranges:
+            self.variable_ranges[name] = self.range_of(self.primary)
+
+    def print_variable(self, name):
+        self.emit_ln(self.llvm.get_printf_statement(
+            f'{name} = %d\n', f'i32 {self.primary}'))
+
+    def report(self):
+        if not self.value_ranges:
+            return None
+        return (f"Value ranges: {self.simplified_divisions} of "
+                f"{self.divisions} divisions emitted without floor "
+                "correction")
+
+
+def emit_floor_division(backend, source, target):
+    """
+    Emit `target = target / source` for M68k, rounding the quotient down.
+
+    `DIVS` truncates, and leaves the quotient in the low and the remainder
+    in the high word of the target. A non-zero remainder whose sign differs
+    from the divisor's means the quotient has to be decremented, like the
+    `@floor_div` of the LLVM IR code. `source` is a data register or a word
+    immediate, the quotient is left in the low word of the target.
+
+    For a positive immediate divisor the signs differ exactly if the
+    remainder is negative, which `TST.L` reads from bit 31; the quotient is
+    then decremented in the low word, without the swaps.
+    """
+    label = backend.new_label('FLOOR')
+    backend.emit_ln(f'DIVS {source},{target}',
+                    f'{target} /= {source} (signed division)')
+    if source.startswith('#') and int(source[1:]) > 0:
+        backend.emit_ln(f'TST.L {target}', 'Remainder negative?')
+        backend.emit_ln(f'BPL {label}', 'No, quotient rounded down')
+        backend.emit_ln(f'SUBQ #1,{target}', 'Decrement the quotient')
+        backend.emit_ln(f'{label}:', indent=0)
+        return
+    backend.emit_ln(f'SWAP {target}', 'Remainder to the low word')
+    backend.emit_ln(f'TST {target}', 'Remainder zero?')
+    backend.emit_ln(f'BEQ {label}', 'Exact quotient')
+    backend.emit_ln(f'EOR {source},{target}',
+                    'Remainder and divisor signs differ?')
+    backend.emit_ln(f'BPL {label}', 'Same signs, quotient rounded down')
+    backend.emit_ln(f'SUB.L #65536,{target}', 'Decrement the quotient')
+    backend.emit_ln(f'{label}:', indent=0)
+    backend.emit_ln(f'SWAP {target}', 'Quotient to the low word')
+
+
+def literal_value(operand):
+    """
+    Return the i32 value of a literal operand, None for SSA variables.
+
+    LLVM wraps an `i32` literal around to 32 bits, so e.g. 4294967295 is -1.
+    """
+    if operand.startswith('%'):
+        return None
+    return wrap_i32(int(operand))
+
+
+OPERATORS = {'add': '+', 'sub': '-', 'mul': '*', 'floor_div': '/'}
+LLVM_OPTIMIZATIONS = ('copy-propagation', 'mem2reg', 'value-numbering',
+                      'strength-reduction', 'value-ranges')
+M68K_OPTIMIZATIONS = ('strength-reduction', 'register-allocation',
+                      'peephole')
@@ -0,0 +1,51 @@
+"""
+Benchmark the cost of each code generation backend.
+
+The same generated program is compiled with no backend (parsing only), with
+a single backend, and with both backends. Since only the selected backends
+are invoked, a single-backend run costs parsing plus that backend alone.
+
+Usage: python benchmark_backends.py [--lines N] [--repeat N]
+"""
+import io
+import time
+import argparse
+from corpus import generate_assignments
+from scanner import Scanner
+from code_processor import CodeProcessor
+
+
+def compile_program(lines, m68k, llvm):
+    """Compile the program for the selected targets, return elapsed seconds."""
+    code_proc = CodeProcessor(Scanner(''))
+    if m68k:
+        code_proc.set_m68k_code_output_file(io.StringIO())
+    if llvm:
+        code_proc.set_llvm_code_output_file(io.StringIO())
+    start = time.perf_counter()
+    code_proc.test_assignment(lines)
+    code_proc.close()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    lines = generate_assignments(args.lines)
+    print(f"{args.lines} statements, {sum(map(len, lines))} characters")
+
+    results = {}
+    for name, m68k, llvm in (('parse only', False, False),
+                             ('M68k only', True, False),
+                             ('LLVM only', False, True),
+                             ('M68k + LLVM', True, True)):
+        results[name] = min(compile_program(lines, m68k, llvm)
+                            for _ in range(args.repeat))
+        print(f"{name:>12}: {results[name]:.3f} s")
+    m68k_cost = results['M68k only'] - results['parse only']
+    llvm_cost = results['LLVM only'] - results['parse only']
+    both_cost = results['M68k + LLVM'] - results['parse only']
+    print(f"backend cost: M68k {m68k_cost:.3f} s, LLVM {llvm_cost:.3f} s, "
+          f"both {both_cost:.3f} s")
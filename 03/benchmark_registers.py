@@ -0,0 +1,76 @@
+"""
+Static cycle comparison of the M68k stack code and register allocation.
+
+The expressions of chapter 02 (one per line) are compiled three ways:
+
+- by the chapter 02 compiler (`emit_ln_m68k`, expressions only),
+- by the stack backend of this chapter, as assignments `E=<expression>`,
+- with `--optimize register-allocation`, as the same assignments.
+
+The generated code is not run; the cycles and code size are estimated with
+the 68000 timing table in `m68k_cost`. The chapter 02 code truncates its
+divisions, the code of this chapter rounds them down, which costs a few
+extra instructions per division.
+
+Usage: python benchmark_registers.py [input]
+"""
+import io
+import os
+import sys
+import argparse
+import tempfile
+import subprocess
+from m68k_cost import program_cost
+from scanner import Scanner
+from code_processor import CodeProcessor
+
+CHAPTER_02 = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, '02'))
+
+
+def chapter_02_code(path):
+    """Return the M68k code of the chapter 02 compiler for the input."""
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'output.asm')
+        subprocess.run([sys.executable, 'cradle.py', os.path.abspath(path),
+                        '--M68k', output], cwd=CHAPTER_02, check=True,
+                       capture_output=True)
+        with open(output) as file:
+            return file.read()
+
+
+def assignment_code(expressions, optimizations=()):
+    """Return the M68k code of this chapter for `E=<expression>` lines."""
+    file = io.StringIO()
+    code_proc = CodeProcessor(Scanner(''), optimizations=optimizations)
+    code_proc.set_m68k_code_output_file(file)
+    code_proc.test_assignment(f'E={expression}' for expression in expressions)
+    code_proc.flush()
+    return file.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('input', nargs='?',
+                        default=os.path.join(CHAPTER_02,
+                                             'test_200_expressions.txt'))
+    args = parser.parse_args()
+    with open(args.input) as file:
+        expressions = [line.strip() for line in file if line.strip()]
+    print(f"{len(expressions)} expressions from {args.input}")
+
+    results = {}
+    for (name, code) in (
+            ('02 emit_ln_m68k', chapter_02_code(args.input)),
+            ('03 stack', assignment_code(expressions)),
+            ('03 registers', assignment_code(expressions,
+                                             ('register-allocation',)))):
+        results[name] = program_cost(code.splitlines())
+        (instructions, cycles, size) = results[name]
+        print(f"{name:>16}: {instructions:6} instructions, {cycles:8} cycles "
+              f"({cycles / len(expressions):7.1f} per expression), "
+              f"{size:6} bytes")
+    cycles = results['03 registers'][1]
+    for name in ('02 emit_ln_m68k', '03 stack'):
+        print(f"register allocation vs {name}: "
+              f"{results[name][1] / cycles:.2f}x speedup")
@@ -0,0 +1,68 @@
+"""
+Benchmark the character scanner against the token and byte scanners.
+
+All scanners compile the same generated program; the emitted M68k and
+LLVM IR code is compared for equality and the compile times are reported.
+
+Usage: python benchmark_scanner.py [--lines N] [--repeat N]
+"""
+import io
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+from corpus import generate_assignments
+from scanner import Scanner, TokenScanner, ByteScanner
+from code_processor import CodeProcessor
+
+
+def compile_m68k(scanner_class, lines, emit=True):
+    """Compile the program to M68k code, return the elapsed seconds."""
+    code_proc = CodeProcessor(scanner_class(''))
+    if emit:
+        code_proc.set_m68k_code_output_file(io.StringIO())
+    start = time.perf_counter()
+    code_proc.test_assignment(lines)
+    return time.perf_counter() - start
+
+
+def run_cradle(path, scanner):
+    """Run the cradle with the given scanner, return (M68k, LLVM) output."""
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([sys.executable, 'cradle.py', path,
+                        '--scanner', scanner,
+                        '--M68k', f'{tmp}/out.asm', '--LLVM', f'{tmp}/out.ll'],
+                       check=True, stdout=subprocess.DEVNULL)
+        with open(f'{tmp}/out.asm', encoding='utf-8') as asm, \
+                open(f'{tmp}/out.ll', encoding='utf-8') as ll:
+            return asm.read(), ll.read()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    lines = generate_assignments(args.lines)
+    print(f"{args.lines} statements, {sum(map(len, lines))} characters")
+
+    with tempfile.NamedTemporaryFile('w', suffix='.txt') as source:
+        source.write('\n'.join(lines))
+        source.flush()
+        reference = run_cradle(source.name, 'char')
+        if any(run_cradle(source.name, scanner) != reference
+               for scanner in ('token', 'byte')):
+            sys.exit("### Error: emitted code differs between scanners.")
+    print("Emitted M68k and LLVM IR code is identical.")
+
+    for emit in (False, True):
+        print("parse and emit M68k code:" if emit else "parse only:")
+        results = {}
+        for name, scanner_class in (('char', Scanner), ('token', TokenScanner),
+                                    ('byte', ByteScanner)):
+            results[name] = min(compile_m68k(scanner_class, lines, emit)
+                                for _ in range(args.repeat))
+            print(f"  {name:>5} scanner: {results[name]:.3f} s")
+        for name in ('token', 'byte'):
+            print(f"  {name} speedup: {results['char'] / results[name]:.2f}x")
@@ -0,0 +1,111 @@
+"""
+Micro-benchmark of strength reduction on the generated binaries.
+
+Every expression is compiled into a `@kernel(i32 %x)` function, once with
+plain copy propagation and once with 'strength-reduction', and called in a
+loop over positive and negative arguments. The IR is built into an
+executable with the same pipeline as `build_and_run.sh` (`opt -O0`,
+`llc -O0`, linking with the C compiler) and the fastest run is reported.
+Both executables must print the same checksum.
+
+Usage: python benchmark_strength.py [--iterations N] [--repeat N] [--cc CC]
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+import subprocess
+from scanner import Scanner
+from emitter import Emitter
+from backends import OptimizingLlvmBackend
+from code_processor import CodeProcessor
+from syntax_tree import lower_expression
+
+EXPRESSIONS = ('X*8', 'X*10', 'X*12', 'X/8', 'X/7', 'X/1000')
+VARIANTS = (('plain', ()), ('reduced', ('strength-reduction',)))
+
+
+def kernel_module(expression, optimizations, iterations):
+    """Return an LLVM IR module calling the expression in a loop."""
+    program = CodeProcessor(Scanner('')).parse_program([f'Y={expression}'])
+    file = io.StringIO()
+    backend = OptimizingLlvmBackend(Emitter(file, comments=False),
+                                    ('mem2reg',) + optimizations)
+    backend.variables['X'] = '%x'
+    lower_expression(program.statements[0].expression, backend)
+    backend.flush()
+    printf = backend.llvm.get_printf_statement('%d\n', 'i32 %acc')
+    first = -(iterations // 2)
+    return f"""define i32 @kernel(i32 %x) noinline {{
+{file.getvalue()}    ret i32 {backend.primary}
+}}
+
+define i32 @main(i32 %argc, i8** %argv) {{
+entry:
+    br label %loop
+loop:
+    %i = phi i32 [{first}, %entry], [%next, %loop]
+    %acc_in = phi i32 [0, %entry], [%acc_out, %loop]
+    %x = mul i32 %i, 40503
+    %y = call i32 @kernel(i32 %x)
+    %acc_out = add i32 %acc_in, %y
+    %next = add i32 %i, 1
+    %done = icmp eq i32 %next, {first + iterations}
+    br i1 %done, label %exit, label %loop
+exit:
+    %acc = add i32 %acc_out, 0
+    {printf}
+    ret i32 0
+}}
+{backend.llvm.LLVM_USED_FUNCTIONS}
+{backend.llvm.llvm_declare_strings()}"""
+
+
+def build(module, directory, name, cc):
+    """Build the module into an executable, return its path."""
+    path = os.path.join(directory, name)
+    with open(f'{path}.ll', 'w') as file:
+        file.write(module)
+    subprocess.run(['opt', '--O0', f'{path}.ll', '-o', f'{path}.bc'],
+                   check=True)
+    subprocess.run(['llc', '-filetype=obj', '-O0', '-relocation-model=pic',
+                    f'{path}.bc', '-o', f'{path}.o'], check=True)
+    subprocess.run([cc, f'{path}.o', '-o', path], check=True)
+    return path
+
+
+def run(path, repeat):
+    """Run the executable, return (fastest seconds, output)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([path], check=True, capture_output=True,
+                                text=True).stdout
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return (best, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=20000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cc', default='cc',
+                        help='C compiler used for linking (default: cc)')
+    args = parser.parse_args()
+    print(f"{args.iterations} calls per kernel")
+    with tempfile.TemporaryDirectory() as directory:
+        for (number, expression) in enumerate(EXPRESSIONS):
+            results = []
+            for (variant, optimizations) in VARIANTS:
+                module = kernel_module(expression, optimizations,
+                                       args.iterations)
+                path = build(module, directory, f'{variant}_{number}', args.cc)
+                results.append(run(path, args.repeat))
+            ((plain, plain_output), (reduced, reduced_output)) = results
+            if plain_output != reduced_output:
+                raise RuntimeError(f"{expression}: checksums differ, "
+                                   f"{plain_output!r} != {reduced_output!r}")
+            print(f"{expression:>10}: plain {plain:.3f} s, reduced "
+                  f"{reduced:.3f} s, speedup {plain / reduced:.2f}x")
@@ -1,71 +1,131 @@
 """Parsing input data and generating formatted code output."""
-import sys
-from llvm import Llvm
-from scanner import Scanner
+from emitter import Emitter
+from backends import M68kBackend, OptimizingM68kBackend
+from backends import LlvmBackend, OptimizingLlvmBackend
+from backends import M68K_OPTIMIZATIONS, LLVM_OPTIMIZATIONS
+from syntax_tree import TreeBuilder, lower_program
+from register_allocation import RegisterM68kBackend
+from peephole import Peephole
+from folding import ConstantFolder
+from cost_report import CostCounter
 
 class CodeProcessor:
     """
     A class for parsing input data and generating formatted code output.
 
     This class integrates parsing and code generation, using an internal
-    scanner for processing input and providing methods to emit code to an
-    output stream.
+    scanner for processing input and reporting every parse action to the
+    code generation backends of the selected output formats.
     You can specify output files by calling either `set_m68k_code_output_file`,
     `set_llvm_code_output_file`, or both, depending on which output formats you
     need.
 
+    Output is buffered by an `Emitter` per backend, so `close` must be called
+    to write the remaining code.
+
     Parameters
     ----------
         scanner (Scanner): A scanner instance used for parsing input data.
+            Any scanner class with the `Scanner` interface can be supplied;
+            `test_assignment` resets it for every line instead of creating a
+            new one.
+        flush_threshold (int): Number of buffered lines per output file that
+            triggers a write.
+        comments (bool): Whether to emit aligned trailing comments.
+        optimizations (iterable): Names of the optimizations to apply, see
+            `OPTIMIZATIONS`. The `TREE_OPTIMIZATIONS` work on the syntax
+            tree and are applied by `test_tree` only.
+        cost_report (bool): Whether to estimate the cost of every statement
+            of the generated code, see `get_cost_counters`.
     """
 
-    def __init__(self, scanner):
+    TREE_OPTIMIZATIONS = ('constant-folding',)
+    OPTIMIZATIONS = tuple(dict.fromkeys(LLVM_OPTIMIZATIONS + M68K_OPTIMIZATIONS
+                                        + TREE_OPTIMIZATIONS))
+
+    def __init__(self, scanner, flush_threshold=Emitter.FLUSH_THRESHOLD,
+                 comments=True, optimizations=(), cost_report=False):
         self.__scanner = scanner
-        self.__file_m68k = None
-        self.__file_llvm = None
-        self.__llvm = Llvm()
+        self.__optimizations = frozenset(optimizations)
+        self.__backend_m68k = None
+        self.__backend_llvm = None
+        self.__backends = ()
+        self.__constant_folder = None
+        self.__peephole = None
+        self.__cost_report = cost_report
+        self.__cost_counters = {}
+        self.__emitter_options = dict(flush_threshold=flush_threshold,
+                                      comments=comments)
 
     def set_m68k_code_output_file(self, file):
         """Set output file for M68k code."""
-        self.__file_m68k = file
+        m68k_optimizations = self.__optimizations & set(M68K_OPTIMIZATIONS)
+        if 'register-allocation' in m68k_optimizations:
+            self.__backend_m68k = self.__new_backend(RegisterM68kBackend, file)
+        elif 'strength-reduction' in m68k_optimizations:
+            self.__backend_m68k = self.__new_backend(OptimizingM68kBackend,
+                                                     file, m68k_optimizations)
+        else:
+            self.__backend_m68k = self.__new_backend(M68kBackend, file)
+        self.__count_costs(self.__backend_m68k, 'M68k')
+        if 'peephole' in m68k_optimizations and file is not None:
+            self.__peephole = Peephole(self.__backend_m68k.emitter)
+            self.__backend_m68k.emitter = self.__peephole
+        self.__update_backends()
 
     def set_llvm_code_output_file(self, file):
         """Set output file for LLVM IR code."""
-        if file:
-            self.__llvm = Llvm(enabled=True)
-        self.__file_llvm = file
+        llvm_optimizations = self.__optimizations & set(LLVM_OPTIMIZATIONS)
+        if llvm_optimizations:
+            self.__backend_llvm = self.__new_backend(OptimizingLlvmBackend,
+                                                     file, llvm_optimizations)
+        else:
+            self.__backend_llvm = self.__new_backend(LlvmBackend, file)
+        self.__count_costs(self.__backend_llvm, 'LLVM')
+        self.__update_backends()
+
+    def __new_backend(self, backend_class, file, *args):
+        if file is None:
+            return None
+        return backend_class(Emitter(file, **self.__emitter_options), *args)
+
+    def __count_costs(self, backend, target):
+        self.__cost_counters.pop(target, None)
+        if self.__cost_report and backend is not None:
+            backend.emitter = CostCounter(backend.emitter, target)
+            self.__cost_counters[target] = backend.emitter
+
+    def __update_backends(self):
+        self.__backends = tuple(backend for backend in (self.__backend_m68k,
+                                                        self.__backend_llvm)
+                                if backend is not None)
+
+    def get_constant_folder(self):
+        """Return the `ConstantFolder` of the last `test_tree` or None."""
+        return self.__constant_folder
 
-    def __close(self, file):
-        if file is not None and file is not sys.stdout:
-            file.close()
+    def get_cost_counters(self):
+        """Return the `CostCounter` of every output if `cost_report` is set."""
+        return list(self.__cost_counters.values())
+
+    def get_reports(self):
+        """Return the summaries of the applied optimizations."""
+        reports = [backend.report() for backend in self.__backends]
+        if self.__peephole is not None:
+            reports.insert(0, self.__peephole.report())
+        if self.__constant_folder is not None:
+            reports.insert(0, self.__constant_folder.report())
+        return [report for report in reports if report is not None]
+
+    def flush(self):
+        """Write buffered code to the output files, leaving them open."""
+        for backend in self.__backends:
+            backend.flush()
 
     def close(self):
-        """Close output files."""
-        self.__close(self.__file_m68k)
-        self.__close(self.__file_llvm)
-
-    def __emit(self, file, s, comment='', indent=1):
-        """Output a string with a tab and aligned trailing comments."""
-        tab_size = 4
-        base_length = len("\t") + len(s) + tab_size
-        padding = max(35 - base_length, 1)
-        aligned_comment = f"{' ' * padding} ; {comment}" if comment else ""
-        print(f"{' ' * indent * 4}{s}{aligned_comment}", end='', file=file)
-
-    def __emit_ln(self, file, s, comment='', indent=1):
-        """Output a string with a tab and a newline."""
-        self.__emit(file, s, comment, indent)
-        print(file=file)
-
-    def emit_ln_m68k(self, s, comment='', indent=1):
-        """Output a string targeting Motorola 68000 code with newline."""
-        if self.__file_m68k:
-            self.__emit_ln(self.__file_m68k, s, comment)
-
-    def emit_ln_llvm(self, s, comment='', indent=1):
-        """Output a string targeting LLVM IR code with newline."""
-        if self.__file_llvm:
-            self.__emit_ln(self.__file_llvm, s, comment, indent)
+        """Flush buffered code and close output files."""
+        for backend in self.__backends:
+            backend.close()
 
     def ident(self):
         """Parse and Translate an Identifier."""
@@ -73,14 +133,11 @@ class CodeProcessor:
         if self.__scanner.peek_char() == '(':
             self.__scanner.match('(')
             self.__scanner.match(')')
-            self.emit_ln_m68k(f'BSR {name}', f'call {name}()')
-            ssa = self.__llvm.new_ssa_variable()
-            self.emit_ln_llvm(f'{ssa} = call i32 {name}()')
+            for backend in self.__backends:
+                backend.call_function(name)
         else:
-            self.emit_ln_m68k(f'MOVE {name}(PC), D0', f'D0 = {name}')
-            ssa = self.__llvm.new_ssa_variable()
-            self.emit_ln_llvm(f'{ssa} = load i32, i32* %{name}',
-                              f'{ssa} = {name}')
+            for backend in self.__backends:
+                backend.load_variable(name)
 
     def factor(self):
         """Parse and Translate a Math Factor."""
@@ -92,38 +149,29 @@ class CodeProcessor:
             self.ident()
         else:
             num = self.__scanner.get_num()
-            self.emit_ln_m68k(f'MOVE #{num}, D0', f'D0 = {num}')
-            ssa = self.__llvm.new_ssa_variable()
-            self.emit_ln_llvm(f'{ssa} = add i32 {num}, 0', f'{ssa} = {num}')
+            for backend in self.__backends:
+                backend.load_number(num)
 
     def multiply(self):
         """Recognize and Translate a Multiply."""
         self.__scanner.match('*')
         self.factor()
-        self.emit_ln_m68k('MULS (SP)+,D0', 'D0 *= (SP); increment SP (pop)')
-        (last_ssa, new_ssa, stack_ssa) = self.__llvm.get_last_new_and_pop_ssa()
-        self.emit_ln_llvm(f'{new_ssa} = mul i32 {stack_ssa}, {last_ssa}')
+        for backend in self.__backends:
+            backend.multiply()
 
     def divide(self):
         """Recognize and Translate a Divide."""
         self.__scanner.match('/')
         self.factor()
-        self.emit_ln_m68k('MOVE (SP)+,D1', 'D1 = (SP); increment SP (pop)')
-        self.emit_ln_m68k('EXT.L D0', 'Sign-extend the value in D0 to 32 bits')
-        self.emit_ln_m68k('DIVS D1,D0', 'D0 /= D1 (signed division)')
-        (op2, ssa, op1) = self.__llvm.get_last_new_and_pop_ssa()
-        self.emit_ln_llvm(f'{ssa} = call i32 @floor_div(i32 {op1}, i32 {op2})')
+        for backend in self.__backends:
+            backend.divide()
 
     def term(self):
         """Parse and Translate a Math Term."""
         self.factor()
         while self.__scanner.peek_char() in ('*', '/'):
-            self.emit_ln_m68k('MOVE D0,-(SP)', 'decrement SP; (SP)=D0 (push)')
-            if self.__file_llvm:
-                ssa_stack = self.__llvm.push_new_llvm_variable_to_stack()
-                ssa = self.__llvm.last_ssa_variable()
-                self.emit_ln_llvm(f'{ssa_stack} = add i32 {ssa}, 0',
-                                  f'{ssa_stack} = {ssa}')
+            for backend in self.__backends:
+                backend.push_factor()
             match self.__scanner.peek_char():
                 case '*': self.multiply()
                 case '/': self.divide()
@@ -133,32 +181,26 @@ class CodeProcessor:
         """Recognize and Translate an Add."""
         self.__scanner.match('+')
         self.term()
-        self.emit_ln_m68k('ADD (SP)+,D0', 'D0 += (SP); increment SP (pop)')
-        (last_ssa, new_ssa, stack_ssa) = self.__llvm.get_last_new_and_pop_ssa()
-        self.emit_ln_llvm(f'{new_ssa} = add i32 {stack_ssa}, {last_ssa}')
+        for backend in self.__backends:
+            backend.add()
 
     def subtract(self):
         """Recognize and Translate a Subtract."""
         self.__scanner.match('-')
         self.term()
-        self.emit_ln_m68k('SUB (SP)+,D0', 'D0 -= (SP); increment SP (pop)')
-        self.emit_ln_m68k('NEG D0', 'D0 = -D0 (negate)')
-        (last_ssa, new_ssa, stack_ssa) = self.__llvm.get_last_new_and_pop_ssa()
-        self.emit_ln_llvm(f'{new_ssa} = sub i32 {stack_ssa}, {last_ssa}')
+        for backend in self.__backends:
+            backend.subtract()
 
     def expression(self):
         """Parse and Translate an Expression."""
         if self.__scanner.is_peek_addop():
-            self.emit_ln_m68k('CLR D0', 'Clear D0 (set to 0)')
-            ssa = self.__llvm.new_ssa_variable()
-            self.emit_ln_llvm(f'{ssa} = add i32 0, 0')
+            for backend in self.__backends:
+                backend.clear()
         else:
             self.term()
         while self.__scanner.is_peek_addop():
-            self.emit_ln_m68k('MOVE D0,-(SP)', 'push D0 onto stack')
-            ssa = self.__llvm.last_ssa_variable()
-            stack_ssa = self.__llvm.push_new_llvm_variable_to_stack()
-            self.emit_ln_llvm(f'{stack_ssa} = add i32 {ssa}, 0')
+            for backend in self.__backends:
+                backend.push_term()
             match self.__scanner.peek_char():
                 case '+': self.add()
                 case '-': self.subtract()
@@ -169,26 +211,69 @@ class CodeProcessor:
         name = self.__scanner.get_name()
         self.__scanner.match('=')
         self.expression()
-        self.emit_ln_m68k(f'LEA {name}(PC),A0', f'A0 = addr({name})')
-        self.emit_ln_m68k('MOVE D0,(A0)', f'{name} = D0')
-        last_ssa = self.__llvm.last_ssa_variable()
-        self.emit_ln_llvm(f'%{name} = alloca i32', f'int {name}')
-        self.emit_ln_llvm(f'store i32 {last_ssa}, i32* %{name}',
-                          f'{name} = {last_ssa}')
+        for backend in self.__backends:
+            backend.store_variable(name)
         return name
 
+    def __test_statement(self):
+        """Translate one assignment and print the assigned value."""
+        name = self.assignment()
+        if self.__scanner.peek_char() not in (None, '\n', '\r'):
+            self.__scanner.expected('Newline', self.__scanner.peek_char())
+        for backend in self.__backends:
+            backend.print_variable(name)
+
     def test_assignment(self, assignments):
-        """Test assignments."""
-        self.emit_ln_llvm(self.__llvm.LLVM_MAIN_HEADER, indent=0)
-        count = 0
+        """Test assignments, one per line, reusing the scanner."""
+        for backend in self.__backends:
+            backend.begin_program()
         for assignment in assignments:
-            count += 1
-            self.__scanner = Scanner(assignment)
-            name = self.assignment()
-            new_ssa = self.__llvm.new_ssa_variable()
-            self.emit_ln_llvm(f'{new_ssa} = load i32, i32* %{name}')
-            self.emit_ln_llvm(self.__llvm.get_printf_statement(
-                f'{name} = %d\n', f'i32 {new_ssa}'))
-        self.emit_ln_llvm(self.__llvm.LLVM_MAIN_RETURN, indent=0)
-        self.emit_ln_llvm(self.__llvm.LLVM_USED_FUNCTIONS, indent=0)
-        self.emit_ln_llvm(self.__llvm.llvm_declare_strings(), indent=0)
+            self.__scanner.reset(assignment)
+            self.__test_statement()
+        for backend in self.__backends:
+            backend.end_program()
+
+    def test_program(self):
+        """Test the assignments of the whole multi-line scanner input."""
+        for backend in self.__backends:
+            backend.begin_program()
+        while self.__scanner.peek_char() is not None:
+            self.__test_statement()
+            self.__scanner.new_line()
+        for backend in self.__backends:
+            backend.end_program()
+
+    def parse_program(self, assignments=None):
+        """
+        Parse the program into a syntax tree without generating code.
+
+        The assignments are either taken one per line from `assignments` or,
+        if it is None, from the whole multi-line scanner input.
+        """
+        builder = TreeBuilder()
+        backends = self.__backends
+        self.__backends = (builder,)
+        try:
+            if assignments is None:
+                self.test_program()
+            else:
+                self.test_assignment(assignments)
+        finally:
+            self.__backends = backends
+        return builder.program
+
+    def test_tree(self, assignments=None):
+        """
+        Test assignments by parsing them into a syntax tree first.
+
+        The tree is lowered to every selected backend in a separate pass,
+        which generates the same code as `test_program`/`test_assignment`
+        unless 'constant-folding' is selected; then constant subexpressions
+        and variables known to be constant are evaluated before lowering.
+        """
+        program = self.parse_program(assignments)
+        if 'constant-folding' in self.__optimizations:
+            self.__constant_folder = ConstantFolder()
+            self.__constant_folder.fold_program(program)
+        for backend in self.__backends:
+            lower_program(program, backend)
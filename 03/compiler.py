@@ -0,0 +1,47 @@
+"""Compiling whole programs to code held in a string."""
+import io
+from scanner import Scanner
+from code_processor import CodeProcessor
+
+class Compiler:
+    """
+    A reentrant compiler of whole programs.
+
+    Every call to `compile` creates its own scanner, code processor and code
+    generator state, so nothing leaks from one compilation to the next and a
+    single instance can be shared by threads, e.g. the workers of a
+    `ThreadPoolExecutor` in a long-lived compile service.
+
+    Parameters
+    ----------
+        target (str): The output format, either 'llvm' or 'm68k'.
+        scanner_class (type): The scanner class used for parsing.
+        comments (bool): Whether to emit aligned trailing comments.
+
+    Raises
+    ------
+    ValueError: If the target is unknown.
+    CompileError: From `compile`, if the source has a syntax error.
+    """
+
+    TARGETS = ('llvm', 'm68k')
+
+    def __init__(self, target='llvm', scanner_class=Scanner, comments=True):
+        if target not in self.TARGETS:
+            raise ValueError(f'target={target} is invalid.')
+        self.__target = target
+        self.__scanner_class = scanner_class
+        self.__comments = comments
+
+    def compile(self, source):
+        """Compile the program in `source` and return the generated code."""
+        output = io.StringIO()
+        code_proc = CodeProcessor(self.__scanner_class(source),
+                                  comments=self.__comments)
+        if self.__target == 'llvm':
+            code_proc.set_llvm_code_output_file(output)
+        else:
+            code_proc.set_m68k_code_output_file(output)
+        code_proc.test_program()
+        code_proc.flush()
+        return output.getvalue()
@@ -0,0 +1,60 @@
+"""Generating large, reproducible input programs for benchmarks."""
+import random
+
+
+def generate_expression(rng, names, depth=0):
+    """Generate a random expression over the given variable names."""
+    terms = []
+    for _ in range(rng.randint(1, 3)):
+        factors = [generate_factor(rng, names, depth)]
+        for _ in range(rng.randint(0, 2)):
+            if rng.random() < 0.5:
+                factors.append('*')
+                factors.append(generate_factor(rng, names, depth))
+            else:
+                factors.append('/')
+                factors.append(str(rng.randint(1, 9)))
+        terms.append(' '.join(factors))
+    result = terms[0]
+    for term in terms[1:]:
+        result += f" {rng.choice('+-')} {term}"
+    if rng.random() < 0.1:
+        result = f'-{result}'
+    return result
+
+
+def generate_factor(rng, names, depth):
+    """Generate a random factor: a number, a variable, or a subexpression."""
+    choice = rng.random()
+    if choice < 0.15 and depth < 2:
+        return f'({generate_expression(rng, names, depth + 1)})'
+    if choice < 0.55 and names:
+        return rng.choice(names)
+    return str(rng.randint(0, 99))
+
+
+def generate_assignments(count, seed=0, variables=20, reassign=True):
+    """
+    Generate `count` assignment statements, one per line.
+
+    Only variables that have already been assigned are read, and divisors are
+    always non-zero literals, so the generated program can be executed. With
+    `reassign` False every statement assigns a new variable, and the last
+    `variables` ones are read.
+    """
+    rng = random.Random(seed)
+    pool = [f'v{i}' for i in range(variables)]
+    names = []
+    lines = []
+    for i in range(count):
+        if reassign:
+            name = rng.choice(pool)
+            lines.append(f'{name} = {generate_expression(rng, names)}')
+            if name not in names:
+                names.append(name)
+        else:
+            name = f'v{i}'
+            lines.append(f'{name} = {generate_expression(rng, names)}')
+            names.append(name)
+            names = names[-variables:]
+    return lines
@@ -0,0 +1,210 @@
+"""
+Per-statement cost reports of the generated code.
+
+A `CostCounter` sits in front of the `Emitter` of a backend (behind any
+`Peephole`, so it sees the final code) and estimates every emitted
+instruction: M68k code with the 68000 cycle and size table of `m68k_cost`,
+LLVM IR with the latency model of `llvm_cost`. The instructions are
+attributed to the statement they belong to; a statement ends with the store
+of the assigned variable (M68k) or the `printf` of its value (LLVM IR).
+
+The reports are written as CSV or JSON. Run as a script, the module reports
+the costs of a generated `.asm` or `.ll` file, for example the output of the
+chapter 02 compiler (its M68k code stores no variables, so only the totals
+are reported for it):
+
+    python cost_report.py ../02/test_200_expressions.ll --format json
+"""
+import re
+import csv
+import sys
+import json
+import argparse
+from collections import namedtuple
+from m68k_cost import instruction_cost, parse_instruction, addressing_mode
+from llvm_cost import instruction_latency
+
+StatementCost = namedtuple('StatementCost', ('statement', 'variable',
+                                             'instructions', 'cycles',
+                                             'bytes'))
+
+TARGETS = ('M68k', 'LLVM')
+FORMATS = ('csv', 'json')
+STRING_PATTERN = re.compile(r'(?P<label>@str_\d+) = .*c"(?P<text>[^"]*)"')
+PRINT_PATTERN = re.compile(r'@printf\(.*(?P<label>@str_\d+), i32 0, i32 0\), ')
+VARIABLE_PATTERN = re.compile(r'(?P<name>\w+) = %d')
+
+
+class CostCounter:
+    """
+    An emitter wrapper estimating the cost of every statement of the code.
+
+    Parameters
+    ----------
+        emitter (Emitter): The emitter the code is passed on to, or None to
+            only count lines given to `add`.
+        target (str): 'M68k' or 'LLVM', see `TARGETS`.
+
+    Attributes
+    ----------
+        statements (list): A `StatementCost` per completed statement.
+        totals (StatementCost): The costs of all instructions, including the
+            ones outside of statements.
+    """
+
+    def __init__(self, emitter, target):
+        if target not in TARGETS:
+            raise ValueError(f"Unknown target: {target}")
+        self.emitter = emitter
+        self.target = target
+        self.statements = []
+        self.__instructions = self.__cycles = self.__bytes = 0
+        self.__totals = [0, 0, 0]
+        self.__address = None
+        self.__in_main = False
+        self.__labels = {}
+
+    @property
+    def totals(self):
+        """The total `StatementCost` of the code counted so far."""
+        (instructions, cycles, size) = self.__totals
+        return StatementCost('total', '', instructions, cycles,
+                             size if self.target == 'M68k' else None)
+
+    def emit_ln(self, s, comment='', indent=1):
+        """Count the lines of an instruction and pass it on."""
+        for line in s.split('\n'):
+            self.add(line)
+        self.emitter.emit_ln(s, comment, indent)
+
+    def flush(self):
+        """Write buffered code."""
+        self.emitter.flush()
+
+    def close(self):
+        """Close the output file."""
+        self.emitter.close()
+
+    def add(self, line):
+        """Count one line of generated code."""
+        if self.target == 'M68k':
+            self.__add_m68k(line)
+        else:
+            self.__add_llvm(line)
+
+    def __add_m68k(self, line):
+        (cycles, size) = instruction_cost(line)
+        if not size:
+            return
+        self.__count(cycles, size)
+        (mnemonic, _, operands) = parse_instruction(line)
+        if mnemonic == 'LEA':
+            self.__address = operands[0].removesuffix('(PC)')
+        elif mnemonic == 'MOVE' and operands[1] == '(A0)':
+            self.__end_statement(self.__address)
+        elif mnemonic == 'MOVE' and addressing_mode(operands[1]) == 'abs':
+            self.__end_statement(operands[1])
+
+    def __add_llvm(self, line):
+        code = line.strip()
+        if code.startswith('define i32 @main('):
+            self.__in_main = True
+            return
+        if not self.__in_main:
+            match = STRING_PATTERN.match(code)
+            if match is not None:
+                self.__resolve(match.group('label'), match.group('text'))
+            return
+        if code.startswith('}'):
+            self.__in_main = False
+            return
+        latency = instruction_latency(line)
+        if latency is None:
+            return
+        self.__count(latency, 0)
+        match = PRINT_PATTERN.search(code)
+        if match is not None:
+            label = match.group('label')
+            self.__labels.setdefault(label, []).append(len(self.statements))
+            self.__end_statement('')
+
+    def __count(self, cycles, size):
+        self.__instructions += 1
+        self.__cycles += cycles
+        self.__bytes += size
+        totals = self.__totals
+        totals[0] += 1
+        totals[1] += cycles
+        totals[2] += size
+
+    def __end_statement(self, variable):
+        self.statements.append(StatementCost(
+            len(self.statements) + 1, variable, self.__instructions,
+            self.__cycles, self.__bytes if self.target == 'M68k' else None))
+        self.__instructions = self.__cycles = self.__bytes = 0
+
+    def __resolve(self, label, text):
+        """Name the statements printing the string constant `label`."""
+        match = VARIABLE_PATTERN.search(text)
+        if match is None:
+            return
+        for index in self.__labels.pop(label, ()):
+            self.statements[index] = self.statements[index]._replace(
+                variable=match.group('name'))
+
+    def report(self):
+        """Return a one-line summary of the totals."""
+        totals = self.totals
+        size = '' if totals.bytes is None else f", {totals.bytes} bytes"
+        return (f"Cost ({self.target}): {len(self.statements)} statements, "
+                f"{totals.instructions} instructions, {totals.cycles} "
+                f"cycles{size}")
+
+
+def write_report(file, counters, format='csv'):
+    """
+    Write the statement costs of the counters as CSV or JSON.
+
+    Parameters
+    ----------
+        file (file object): The output file.
+        counters (iterable): The `CostCounter` of every target.
+        format (str): 'csv' or 'json'. The CSV has a row per statement and a
+            'total' row per target; the JSON has an object per target with
+            the lists of `statements` and the `totals`.
+    """
+    if format == 'json':
+        json.dump({counter.target: {
+            'statements': [cost._asdict() for cost in counter.statements],
+            'totals': counter.totals._asdict()} for counter in counters},
+                  file, indent=1)
+        file.write('\n')
+        return
+    writer = csv.writer(file, lineterminator='\n')
+    writer.writerow(('target',) + StatementCost._fields)
+    for counter in counters:
+        for cost in counter.statements + [counter.totals]:
+            writer.writerow((counter.target,) + tuple(
+                '' if value is None else value for value in cost))
+
+
+def report_format(path, format=None):
+    """Return the given format or the one of the file extension."""
+    if format is not None:
+        return format
+    return 'json' if path.lower().endswith('.json') else 'csv'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('input',
+                        help='a generated .asm (M68k) or .ll (LLVM IR) file')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    args = parser.parse_args()
+    counter = CostCounter(None, 'LLVM' if args.input.endswith('.ll')
+                          else 'M68k')
+    with open(args.input, encoding='utf-8') as file:
+        for line in file:
+            counter.add(line.rstrip('\n'))
+    print(counter.report(), file=sys.stderr)
+    write_report(sys.stdout, [counter], args.format)
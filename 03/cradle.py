@@ -10,11 +10,15 @@ Created on Sun Dec 15, 2024
 
 @author: https://github.com/vargajb
 """
+import os
 import sys
+import mmap
 import traceback
 import argparse
-from scanner import Scanner
+from scanner import Scanner, TokenScanner, ByteScanner, CompileError
 from code_processor import CodeProcessor
+from emitter import Emitter
+from cost_report import FORMATS, write_report, report_format
 
 def read_input(path):
     """
@@ -44,6 +48,43 @@ def read_input(path):
             print(f"Error reading file {path}.")
             raise
 
+def stream_input(path, use_mmap=False):
+    """
+    Stream the input file line by line without reading it into memory.
+
+    Parameters
+    ----------
+    path : str
+        The path to the input file.
+    use_mmap : bool
+        - If True, memory-maps the file and decodes one line at a time.
+        - If False, iterates over the lines of the file object.
+
+    Yields
+    ------
+    str
+        The input lines without line terminators.
+    """
+    print(f"Streaming input data from file: {path}")
+    try:
+        if use_mmap:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    # `readline` only breaks at LF, split at CR and CRLF
+                    # too, like the universal newlines of the text path.
+                    for chunk in iter(m.readline, b''):
+                        for line in chunk.splitlines():
+                            yield line.decode("utf-8")
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip('\n')
+    except IOError:
+        print(f"Error reading file {path}.")
+        raise
+
 def open_output(path):
     """
     Open the output destination (either a file or standard output).
@@ -76,19 +117,80 @@ if __name__ == "__main__":
                         help="output file or 'stdout' for M68000 code")
     parser.add_argument('--LLVM', type=str, dest='output_llvm',
                         help="output file or 'stdout' for LLVM IR code")
+    parser.add_argument('--scanner', choices=('char', 'token', 'byte'),
+                        default='char',
+                        help="scan the input character by character, tokenize "
+                        "it up front, or scan it as raw ASCII bytes "
+                        "(default: char)")
+    parser.add_argument('--no-comments', action='store_false', dest='comments',
+                        help='omit the trailing comments from the output')
+    parser.add_argument('--flush-lines', type=int,
+                        default=Emitter.FLUSH_THRESHOLD,
+                        help='number of buffered output lines that triggers a '
+                        f'write (default: {Emitter.FLUSH_THRESHOLD})')
+    parser.add_argument('--optimize', action='append', default=[],
+                        choices=CodeProcessor.OPTIMIZATIONS, metavar='NAME',
+                        help='apply an optimization, can be repeated: '
+                        f"{', '.join(CodeProcessor.OPTIMIZATIONS)}")
+    parser.add_argument('--ast', action='store_true',
+                        help='parse the whole program into a syntax tree '
+                        'before generating code (implied by '
+                        f"{', '.join(CodeProcessor.TREE_OPTIMIZATIONS)})")
+    parser.add_argument('--cost-report', type=str, metavar='FILE',
+                        help="write the estimated cycles, instruction counts "
+                        "and code size of every statement to a file or "
+                        "'stdout'")
+    parser.add_argument('--cost-format', choices=FORMATS,
+                        help='format of the cost report (default: json for '
+                        '.json files, otherwise csv)')
+    parser.add_argument('--stream', action='store_true',
+                        help='compile the input file line by line without '
+                        'reading it into memory')
+    parser.add_argument('--mmap', action='store_true',
+                        help='like --stream, but memory-map the input file')
     args = parser.parse_args()
     if not (args.output_M68k or args.output_llvm):
         parser.error("At least one of --M68k or --LLVM must be specified.")
+    streaming = args.stream or args.mmap
+    if streaming and args.input is None:
+        parser.error("--stream and --mmap require an input file.")
     try:
-        input_data = read_input(args.input)
-        scanner = Scanner(input_data)
-        code_proc = CodeProcessor(scanner)
+        scanner_class = {'char': Scanner, 'token': TokenScanner,
+                         'byte': ByteScanner}[args.scanner]
+        if streaming:
+            scanner = scanner_class('')
+        else:
+            scanner = scanner_class(read_input(args.input))
+        code_proc = CodeProcessor(scanner, args.flush_lines, args.comments,
+                                  args.optimize, args.cost_report is not None)
         if args.output_M68k:
             code_proc.set_m68k_code_output_file(open_output(args.output_M68k))
         if args.output_llvm:
             code_proc.set_llvm_code_output_file(open_output(args.output_llvm))
-        code_proc.test_assignment(input_data.splitlines())
+        lines = stream_input(args.input, args.mmap) if streaming else None
+        tree = set(args.optimize) & set(CodeProcessor.TREE_OPTIMIZATIONS)
+        if args.ast or tree:
+            code_proc.test_tree(lines)
+        elif streaming:
+            code_proc.test_assignment(lines)
+        else:
+            code_proc.test_program()
         code_proc.close()
+        for report in code_proc.get_reports():
+            print(report, file=sys.stderr)
+        if args.cost_report:
+            counters = code_proc.get_cost_counters()
+            for counter in counters:
+                print(counter.report(), file=sys.stderr)
+            file = open_output(args.cost_report)
+            write_report(file, counters,
+                         report_format(args.cost_report, args.cost_format))
+            if file is not sys.stdout:
+                file.close()
+    except CompileError as e:
+        print()
+        print(f"Error: {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"### Error: {e}")
         print("### Detailed traceback:")
@@ -0,0 +1,53 @@
+"""Buffered writing of formatted code lines to an output file."""
+import sys
+
+class Emitter:
+    """
+    A buffered emitter of formatted code lines.
+
+    Formatted lines are collected in a list and written to the output file
+    in large chunks, once `flush_threshold` lines have been buffered and when
+    the emitter is flushed or closed. With `comments` disabled the aligned
+    trailing comments are skipped, which avoids all comment formatting.
+
+    Parameters
+    ----------
+        file (file object): The output file the code is written to.
+        flush_threshold (int): Number of buffered lines that triggers a write.
+        comments (bool): Whether to emit aligned trailing comments.
+    """
+
+    FLUSH_THRESHOLD = 8192
+
+    def __init__(self, file, flush_threshold=FLUSH_THRESHOLD, comments=True):
+        self.__file = file
+        self.__flush_threshold = max(flush_threshold, 1)
+        self.__comments = comments
+        self.__buffer = []
+
+    def emit_ln(self, s, comment='', indent=1):
+        """Buffer a string with an indent, aligned comment and newline."""
+        if comment and self.__comments:
+            tab_size = 4
+            base_length = len("\t") + len(s) + tab_size
+            padding = max(35 - base_length, 1)
+            line = f"{' ' * indent * 4}{s}{' ' * padding} ; {comment}\n"
+        else:
+            line = f"{' ' * indent * 4}{s}\n"
+        self.__buffer.append(line)
+        if len(self.__buffer) >= self.__flush_threshold:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered lines to the output file."""
+        if self.__buffer:
+            self.__file.write(''.join(self.__buffer))
+            self.__buffer.clear()
+
+    def close(self):
+        """Flush the buffered lines and close the output file."""
+        self.flush()
+        if self.__file is sys.stdout:
+            self.__file.flush()
+        else:
+            self.__file.close()
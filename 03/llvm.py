@@ -23,14 +23,18 @@ Methods
   constants.
 """
 class Llvm:
-    """Helper class to generate LLVM IR code."""
+    """
+    Helper class to generate LLVM IR code.
 
-    __disabled = True
-    __ssa_variable_counters = dict()
-    __ssa_variable_stack = list()
+    All SSA counters, the SSA stack and the string constants are kept per
+    instance, so every compilation starts from a clean state.
+    """
 
     def __init__(self, enabled=False):
         self.__disabled = not enabled
+        self.__ssa_variable_counters = dict()
+        self.__ssa_variable_stack = list()
+        self.__string_constants = dict()
 
     def new_ssa_variable(self, prefix='ssa'):
         """Create a new SSA variable with the specified prefix."""
@@ -76,7 +80,6 @@ class Llvm:
                 self.new_ssa_variable(),
                 self.pop_llvm_variable_from_stack())
 
-    __string_constants = dict()
     def get_printf_statement(self, s, *args):
         """Generate an LLVM IR `printf` statement."""
         if s not in self.__string_constants:
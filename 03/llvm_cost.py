@@ -0,0 +1,62 @@
+"""
+Static latency estimates of LLVM IR code.
+
+LLVM IR has no cycle times of its own, so the estimates use a simple latency
+model of a current x86-64 core: every instruction costs the latency of the
+machine instruction it usually becomes, and a call costs the call overhead
+plus the latency of the body of the called function, if it is known.
+Dependencies, pipelining and the work done by `printf` are not modeled, so
+the numbers are only meant for comparing code generation strategies.
+
+Only the instructions of function bodies are counted; labels, definitions,
+declarations and global constants are not instructions.
+"""
+import re
+
+LATENCIES = {'add': 1, 'sub': 1, 'and': 1, 'or': 1, 'xor': 1, 'shl': 1,
+             'ashr': 1, 'lshr': 1, 'icmp': 1, 'select': 1, 'sext': 1,
+             'zext': 1, 'trunc': 1, 'mul': 3, 'sdiv': 26, 'udiv': 26,
+             'srem': 26, 'urem': 26, 'load': 4, 'store': 1, 'alloca': 0,
+             'ret': 1, 'br': 1}
+CALL_LATENCY = 5
+# Latencies of the bodies of the functions defined by `Llvm`, `floor_div` is
+# sdiv, mul, sub, xor, 2 x icmp, and, sub and select.
+FUNCTION_LATENCIES = {'floor_div': 36, 'truncating_div': 27}
+
+INSTRUCTION_PATTERN = re.compile(r'(?:%[\w.]+ = )?(?P<opcode>[a-z]+)\b')
+CALLEE_PATTERN = re.compile(r'@?(?P<callee>[\w.]+)\(')
+
+
+def instruction_latency(line):
+    """
+    Return the estimated latency of a line of a function body, None for
+    lines without an instruction.
+
+    Unknown instructions raise a `ValueError`.
+    """
+    code = line.split(';', 1)[0].strip()
+    if not code or code.endswith(':') or code.startswith(('}', '@', '!')):
+        return None
+    match = INSTRUCTION_PATTERN.match(code)
+    if match is None:
+        raise ValueError(f"Unknown instruction: {code}")
+    opcode = match.group('opcode')
+    if opcode == 'call':
+        callee = CALLEE_PATTERN.search(code, match.end())
+        if callee is None:
+            raise ValueError(f"Unknown call: {code}")
+        return CALL_LATENCY + FUNCTION_LATENCIES.get(callee.group('callee'), 0)
+    if opcode not in LATENCIES:
+        raise ValueError(f"Unknown instruction: {code}")
+    return LATENCIES[opcode]
+
+
+def program_latency(lines):
+    """Return the (instructions, cycles) of the lines of function bodies."""
+    instructions = cycles = 0
+    for line in lines:
+        latency = instruction_latency(line)
+        if latency is not None:
+            instructions += 1
+            cycles += latency
+    return (instructions, cycles)
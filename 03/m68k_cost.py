@@ -0,0 +1,152 @@
+"""
+Static cycle and size estimates of Motorola 68000 assembly code.
+
+The estimates follow the instruction execution times of the MC68000 user's
+manual: every instruction costs its base time plus the effective address
+calculation time of its operands, and takes one operation word plus the
+extension words of its operands. `MULS` and `DIVS` are counted with their
+worst case times, shifts by a register count as shifts by 16, and branches
+as taken short branches (see `BRANCH_TIMES`).
+
+Only the subset of instructions and addressing modes the code generators
+emit is known; anything else raises a `ValueError`.
+"""
+import re
+
+# Effective address calculation times (word, long).
+EA_TIMES = {'Dn': (0, 0), 'An': (0, 0), 'ind': (4, 8), 'postinc': (4, 8),
+            'predec': (6, 10), 'disp': (8, 12), 'abs': (12, 16),
+            'imm': (4, 8)}
+# Additional MOVE destination times (word, long).
+MOVE_DESTINATION_TIMES = {'Dn': (0, 0), 'An': (0, 0), 'ind': (4, 8),
+                          'postinc': (4, 8), 'predec': (4, 8),
+                          'disp': (8, 12), 'abs': (12, 16)}
+REGISTER_SHIFT_COUNT = 16
+# Conditional short branch times (taken, not taken).
+BRANCH_TIMES = (10, 8)
+BRANCHES = ('BRA', 'BHI', 'BLS', 'BCC', 'BCS', 'BNE', 'BEQ', 'BVC', 'BVS',
+            'BPL', 'BMI', 'BGE', 'BLT', 'BGT', 'BLE')
+
+OPERAND_PATTERN = re.compile(r"""
+      (?P<Dn>D[0-7])
+    | (?P<An>A[0-7]|SP)
+    | (?P<ind>\((?:A[0-7]|SP)\))
+    | (?P<postinc>\((?:A[0-7]|SP)\)\+)
+    | (?P<predec>-\((?:A[0-7]|SP)\))
+    | (?P<disp>[A-Za-z0-9_-]+\((?:A[0-7]|SP|PC)\))
+    | (?P<imm>\#-?[0-9]+)
+    | (?P<abs>[A-Za-z_][A-Za-z0-9_]*)
+    """, re.VERBOSE)
+
+
+def parse_instruction(line):
+    """
+    Split an assembly line into (mnemonic, size, operands).
+
+    The comment is dropped, `size` is 'B', 'W' or 'L' ('W' if omitted) and
+    `operands` is a list of the operand strings. Returns None for lines
+    without an instruction and for labels.
+    """
+    code = line.split(';', 1)[0].strip()
+    if not code or code.endswith(':'):
+        return None
+    (mnemonic, _, operands) = code.partition(' ')
+    (mnemonic, _, size) = mnemonic.upper().partition('.')
+    operands = [operand.strip() for operand in operands.split(',')
+                if operand.strip()]
+    return (mnemonic, size or 'W', operands)
+
+
+def addressing_mode(operand):
+    """Return the addressing mode of an operand, see `EA_TIMES`."""
+    match = OPERAND_PATTERN.fullmatch(operand)
+    if match is None:
+        raise ValueError(f"Unknown addressing mode: {operand}")
+    return match.lastgroup
+
+
+def instruction_cost(line):
+    """
+    Return the (cycles, bytes) of an assembly line, (0, 0) for lines without
+    an instruction.
+    """
+    instruction = parse_instruction(line)
+    if instruction is None:
+        return (0, 0)
+    (mnemonic, size, operands) = instruction
+    modes = [addressing_mode(operand) for operand in operands]
+    long = 1 if size == 'L' else 0
+    ea = [EA_TIMES[mode][long] for mode in modes]
+    extension = 0
+    for mode in modes:
+        if mode == 'disp':
+            extension += 1
+        elif mode == 'abs':
+            extension += 2
+        elif mode == 'imm':
+            extension += 2 if long else 1
+    match (mnemonic, modes):
+        case ('MOVEQ', _):
+            (cycles, extension) = (4, 0)
+        case ('ADDQ' | 'SUBQ', [_, 'Dn']):
+            (cycles, extension) = (8 if long else 4, 0)
+        case ('ADDQ' | 'SUBQ', [_, 'An']):
+            (cycles, extension) = (8, 0)
+        case ('MOVE', [_, destination]):
+            cycles = 4 + ea[0] + MOVE_DESTINATION_TIMES[destination][long]
+        case ('ADD' | 'SUB' | 'AND' | 'OR' | 'CMP', [_, 'Dn' | 'An']):
+            if not long:
+                cycles = 4 + ea[0]
+            elif modes[0] in ('Dn', 'An', 'imm'):
+                cycles = 8 + ea[0]
+            else:
+                cycles = 6 + ea[0]
+        case ('ADD' | 'SUB', ['Dn', _]):
+            cycles = (12 if long else 8) + ea[1]
+        case ('MULS' | 'MULU', _):
+            cycles = 70 + ea[0]
+        case ('DIVS', _):
+            cycles = 158 + ea[0]
+        case ('DIVU', _):
+            cycles = 140 + ea[0]
+        case ('NEG' | 'CLR' | 'NOT' | 'TST', ['Dn']):
+            cycles = 6 if long and mnemonic != 'TST' else 4
+        case ('NEG' | 'CLR' | 'NOT' | 'TST', _):
+            cycles = (12 if long else 8) + ea[0]
+        case ('EXT' | 'SWAP', _):
+            cycles = 4
+        case ('EXG', _):
+            cycles = 6
+        case ('EOR', ['Dn', 'Dn']):
+            cycles = 8 if long else 4
+        case ('EOR', ['imm', 'Dn']):
+            cycles = 16 if long else 8
+        case (branch, _) if branch in BRANCHES:
+            (cycles, extension) = (BRANCH_TIMES[0], 0)
+        case ('LEA', _):
+            cycles = {'ind': 4, 'disp': 8, 'abs': 12}[modes[0]]
+        case ('ASL' | 'ASR' | 'LSL' | 'LSR', ['imm', 'Dn']):
+            cycles = (8 if long else 6) + 2 * int(operands[0][1:])
+            extension = 0
+        case ('ASL' | 'ASR' | 'LSL' | 'LSR', ['Dn', 'Dn']):
+            cycles = (8 if long else 6) + 2 * REGISTER_SHIFT_COUNT
+        case ('BSR', _):
+            cycles = 18
+            extension = 1
+        case ('RTS', _):
+            cycles = 16
+        case _:
+            raise ValueError(f"Unknown instruction: {line.strip()}")
+    return (cycles, 2 + 2 * extension)
+
+
+def program_cost(lines):
+    """Return the (instructions, cycles, bytes) of assembly lines."""
+    instructions = cycles = size = 0
+    for line in lines:
+        (line_cycles, line_size) = instruction_cost(line)
+        if line_size:
+            instructions += 1
+            cycles += line_cycles
+            size += line_size
+    return (instructions, cycles, size)
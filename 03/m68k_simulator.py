@@ -0,0 +1,460 @@
+"""
+Instruction-level simulation of the generated Motorola 68000 code.
+
+`M68kSimulator` executes the subset of the 68000 instruction set the code
+generators emit (MOVE, MOVEQ, ADD, SUB, NEG, CLR, TST, EOR, EXT, SWAP, MULS,
+DIVS, the shifts, LEA, BSR, RTS and the conditional branches) with the
+addressing modes they use, including the stack pointer modes `-(SP)` and
+`(SP)+`. Values have the 68000 semantics: word operations only change the
+low word of a data register, `MULS` multiplies words and `DIVS` divides a
+long by a word, leaving the remainder in the high word.
+
+Every variable `X(PC)` gets a long in a data area. `BSR` to a label of the
+program calls it; `BSR` to any other name calls the Python function of that
+name from `functions`, whose result is returned in D0. While running, the
+simulator counts the executed instructions, the cycles of the 68000 timing
+table in `m68k_cost` (`MULS` and branches with their exact times) and the
+data memory accesses, in 16-bit bus accesses.
+
+Run as a script, the module compiles an input program, simulates it and
+checks the final variable values against the interpreter of chapter 04:
+
+    python m68k_simulator.py test_expressions.txt --optimize peephole
+
+With `--all-optimizations` the program is simulated once for every
+combination of the M68k optimizations, each checked the same way.
+
+The interpreter computes with unbounded integers; its values are compared
+after wrapping them to the size of the stores, so programs whose values
+overflow the 16-bit operands of `MULS` and `DIVS` are reported as
+mismatches. Programs reassigning variables, like the `corpus` programs, let
+the interpreter's values grow without bound; simulate them with `--no-check`.
+"""
+import io
+import os
+import sys
+import argparse
+import itertools
+import tempfile
+import subprocess
+from m68k_cost import instruction_cost, parse_instruction, addressing_mode
+from m68k_cost import BRANCH_TIMES
+from scanner import Scanner
+from code_processor import CodeProcessor
+from backends import M68K_OPTIMIZATIONS
+
+CHAPTER_04 = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, '04'))
+
+SIZES = {'B': 1, 'W': 2, 'L': 4}
+CONDITIONS = {
+    'RA': lambda n, z, v, c: True,
+    'HI': lambda n, z, v, c: not c and not z,
+    'LS': lambda n, z, v, c: c or z,
+    'CC': lambda n, z, v, c: not c,
+    'CS': lambda n, z, v, c: c,
+    'NE': lambda n, z, v, c: not z,
+    'EQ': lambda n, z, v, c: z,
+    'VC': lambda n, z, v, c: not v,
+    'VS': lambda n, z, v, c: v,
+    'PL': lambda n, z, v, c: not n,
+    'MI': lambda n, z, v, c: n,
+    'GE': lambda n, z, v, c: n == v,
+    'LT': lambda n, z, v, c: n != v,
+    'GT': lambda n, z, v, c: not z and n == v,
+    'LE': lambda n, z, v, c: z or n != v,
+}
+
+
+def to_signed(value, size):
+    """Return the signed value of the low `size` bytes of `value`."""
+    bits = 8 * size
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+class M68kSimulator:
+    """
+    A simulator of the generated Motorola 68000 code.
+
+    The instructions are decoded once, when the program is loaded. Instructions
+    that read and write their destination (ADD, SUB, NEG, EOR, the shifts)
+    only take register destinations, as in the generated code.
+
+    Parameters
+    ----------
+        lines (iterable): The lines of assembly code.
+        functions (dict): The Python functions called by `BSR` to names that
+            are not labels of the program, by name.
+        memory_size (int): Bytes of memory; the stack starts at the end.
+
+    Attributes
+    ----------
+        instructions (int): Number of executed instructions.
+        cycles (int): Number of clock cycles of the executed instructions.
+        reads (int): Number of 16-bit data memory reads.
+        writes (int): Number of 16-bit data memory writes.
+        stores (dict): The size in bytes of the last store to each variable,
+            by name.
+    """
+
+    DATA = 0x100
+    MEMORY_SIZE = 0x10000
+
+    def __init__(self, lines, functions=None, memory_size=MEMORY_SIZE):
+        self.functions = functions or {}
+        self.memory = bytearray(memory_size)
+        self.data = [0] * 8
+        self.address = [0] * 7 + [memory_size]
+        self.flags = (False, False, False, False)
+        self.instructions = self.cycles = self.reads = self.writes = 0
+        self.stores = {}
+        self.__program = []
+        self.__labels = {}
+        self.__symbols = {}
+        self.__names = {}
+        decoded = {}
+        for line in lines:
+            code = line.split(';', 1)[0].strip()
+            if code.endswith(':'):
+                self.__labels[code[:-1]] = len(self.__program)
+            elif code:
+                if code not in decoded:
+                    decoded[code] = decode(code)
+                self.__program.append(decoded[code])
+
+    def run(self, max_steps=None):
+        """Execute the program until it leaves its end, return self."""
+        program = self.__program
+        pc = 0
+        while 0 <= pc < len(program):
+            if max_steps is not None and self.instructions >= max_steps:
+                raise RuntimeError(f"No end after {max_steps} instructions")
+            (mnemonic, size, operands, cycles) = program[pc]
+            self.instructions += 1
+            self.cycles += cycles
+            pc = self.execute(mnemonic, size, operands, pc + 1)
+        return self
+
+    def variables(self):
+        """Return the signed values of the stored variables, by name."""
+        return {name: to_signed(self.load(self.__symbols[name], size), size)
+                for (name, size) in self.stores.items()}
+
+    def symbol(self, name):
+        """Return the address of a variable, allocating it on first use."""
+        if name not in self.__symbols:
+            address = self.DATA + 4 * len(self.__symbols)
+            self.__symbols[name] = address
+            self.__names[address] = name
+        return self.__symbols[name]
+
+    def load(self, address, size):
+        """Return the unsigned value at a memory address."""
+        return int.from_bytes(self.memory[address:address + size], 'big')
+
+    def store(self, address, size, value):
+        """Write the low `size` bytes of a value to a memory address."""
+        mask = (1 << 8 * size) - 1
+        self.memory[address:address + size] = (value & mask).to_bytes(
+            size, 'big')
+
+    def effective_address(self, operand, size):
+        """Return the address of a memory operand, updating (SP)+/-(SP)."""
+        (operand, mode) = operand
+        match mode:
+            case 'ind':
+                return self.address[register_number(operand[1:-1])]
+            case 'postinc':
+                register = register_number(operand[1:-2])
+                address = self.address[register]
+                self.address[register] += max(size, 2)
+                return address
+            case 'predec':
+                register = register_number(operand[2:-1])
+                self.address[register] -= max(size, 2)
+                return self.address[register]
+            case 'disp':
+                (displacement, _, base) = operand[:-1].partition('(')
+                if base == 'PC':
+                    return self.symbol(displacement)
+                return (self.address[register_number(base)]
+                        + int(displacement))
+            case 'abs':
+                return self.symbol(operand)
+        raise ValueError(f"Not a memory operand: {operand}")
+
+    def read(self, operand, size):
+        """Return the unsigned value of a source operand."""
+        mask = (1 << 8 * size) - 1
+        match operand[1]:
+            case 'imm': return int(operand[0][1:]) & mask
+            case 'Dn': return self.data[int(operand[0][1])] & mask
+            case 'An': return self.address[register_number(operand[0])] & mask
+        address = self.effective_address(operand, size)
+        self.reads += max(size // 2, 1)
+        return self.load(address, size)
+
+    def write(self, operand, size, value):
+        """Write a value to a destination operand."""
+        mask = (1 << 8 * size) - 1
+        match operand[1]:
+            case 'Dn':
+                register = int(operand[0][1])
+                self.data[register] = ((self.data[register] & ~mask)
+                                       | (value & mask)) & 0xffffffff
+                return
+            case 'An':
+                self.address[register_number(operand[0])] = \
+                    value & 0xffffffff
+                return
+            case 'imm':
+                raise ValueError(f"Not a destination: {operand[0]}")
+        address = self.effective_address(operand, size)
+        self.writes += max(size // 2, 1)
+        self.store(address, size, value)
+        if address in self.__names:
+            self.stores[self.__names[address]] = size
+
+    def modify(self, operand, size, value):
+        """Write the result of a read-modify-write instruction."""
+        if operand[1] not in ('Dn', 'An'):
+            raise ValueError(f"Not a register destination: {operand[0]}")
+        self.write(operand, size, value)
+
+    def set_flags(self, result, size, v=False, c=False):
+        """Set N and Z from a result and V and C as given."""
+        result &= (1 << 8 * size) - 1
+        self.flags = (bool(result >> (8 * size - 1)), result == 0, v, c)
+
+    def arithmetic(self, operation, left, right, size):
+        """Return `left op right` for '+'/'-', setting all flags."""
+        bits = 8 * size
+        mask = (1 << bits) - 1
+        if operation == '+':
+            result = (left + right) & mask
+            carry = left + right > mask
+            overflow = ((left ^ result) & (right ^ result)) >> (bits - 1)
+        else:
+            result = (left - right) & mask
+            carry = right > left
+            overflow = ((left ^ right) & (left ^ result)) >> (bits - 1)
+        self.set_flags(result, size, bool(overflow & 1), carry)
+        return result
+
+    def execute(self, mnemonic, size, operands, pc):
+        """Execute one instruction, return the next program counter."""
+        match mnemonic:
+            case 'MOVE':
+                value = self.read(operands[0], size)
+                self.write(operands[1], size, value)
+                if operands[1][1] != 'An':
+                    self.set_flags(value, size)
+            case 'MOVEQ':
+                value = self.read(operands[0], 4)
+                self.write(operands[1], 4, to_signed(value, 1))
+                self.set_flags(to_signed(value, 1), 4)
+            case 'ADD' | 'ADDQ' | 'SUB' | 'SUBQ':
+                right = self.read(operands[0], size)
+                left = self.read(operands[1], size)
+                self.modify(operands[1], size, self.arithmetic(
+                    '+' if mnemonic[0] == 'A' else '-', left, right, size))
+            case 'NEG':
+                value = self.read(operands[0], size)
+                self.modify(operands[0], size,
+                            self.arithmetic('-', 0, value, size))
+            case 'CLR':
+                self.write(operands[0], size, 0)
+                self.set_flags(0, size)
+            case 'TST':
+                self.set_flags(self.read(operands[0], size), size)
+            case 'EOR':
+                value = (self.read(operands[0], size)
+                         ^ self.read(operands[1], size))
+                self.modify(operands[1], size, value)
+                self.set_flags(value, size)
+            case 'EXT':
+                value = to_signed(self.read(operands[0], size // 2), size // 2)
+                self.modify(operands[0], size, value)
+                self.set_flags(value, size)
+            case 'SWAP':
+                value = self.read(operands[0], 4)
+                value = ((value << 16) | (value >> 16)) & 0xffffffff
+                self.modify(operands[0], 4, value)
+                self.set_flags(value, 4)
+            case 'MULS':
+                source = self.read(operands[0], 2)
+                value = to_signed(source, 2) * to_signed(
+                    self.read(operands[1], 2), 2)
+                self.modify(operands[1], 4, value)
+                self.set_flags(value, 4)
+                # 38 + 2n cycles instead of the worst case 70, n is the
+                # number of 01 and 10 bit pairs of the source with a 0
+                # appended.
+                pairs = bin(((source << 1) ^ source) & 0xffff).count('1')
+                self.cycles += 2 * pairs - 32
+            case 'DIVS':
+                divisor = to_signed(self.read(operands[0], 2), 2)
+                if divisor == 0:
+                    raise ZeroDivisionError("DIVS by zero")
+                dividend = to_signed(self.read(operands[1], 4), 4)
+                quotient = abs(dividend) // abs(divisor)
+                if (dividend < 0) != (divisor < 0):
+                    quotient = -quotient
+                remainder = dividend - quotient * divisor
+                if -0x8000 <= quotient <= 0x7fff:
+                    self.modify(operands[1], 4, (remainder << 16)
+                                | (quotient & 0xffff))
+                    self.set_flags(quotient, 2)
+                else:
+                    # Overflow: the operand is unchanged, V is set.
+                    self.flags = self.flags[:2] + (True, False)
+            case 'ASL' | 'ASR' | 'LSL' | 'LSR':
+                count = self.read(operands[0], 4) % 64
+                value = self.read(operands[1], size)
+                if mnemonic == 'ASR':
+                    value = to_signed(value, size) >> count
+                elif mnemonic == 'LSR':
+                    value >>= count
+                else:
+                    value <<= count
+                self.modify(operands[1], size, value)
+                self.set_flags(value, size)
+            case 'LEA':
+                self.modify(operands[1], 4,
+                            self.effective_address(operands[0], 4))
+            case 'BSR':
+                name = operands[0][0]
+                if name in self.__labels:
+                    self.address[7] -= 4
+                    self.writes += 2
+                    self.store(self.address[7], 4, pc)
+                    return self.__labels[name]
+                if name not in self.functions:
+                    raise ValueError(f"Unknown function: {name}")
+                self.write(('D0', 'Dn'), 4, self.functions[name]())
+            case 'RTS':
+                self.reads += 2
+                pc = self.load(self.address[7], 4)
+                self.address[7] += 4
+                return pc
+            case _ if mnemonic[0] == 'B' and mnemonic[1:] in CONDITIONS:
+                if CONDITIONS[mnemonic[1:]](*self.flags):
+                    return self.__labels[operands[0][0]]
+                self.cycles += BRANCH_TIMES[1] - BRANCH_TIMES[0]
+            case _:
+                raise ValueError(f"Unknown instruction: {mnemonic}")
+        return pc
+
+
+def decode(code):
+    """Return the (mnemonic, size, operands, cycles) of an instruction."""
+    (mnemonic, size, operands) = parse_instruction(code)
+    if mnemonic[0] == 'B' and mnemonic != 'BSR':
+        operands = [(operand, 'label') for operand in operands]
+    else:
+        operands = [(operand, addressing_mode(operand))
+                    for operand in operands]
+    return (mnemonic, SIZES[size], operands, instruction_cost(code)[0])
+
+
+def register_number(name):
+    """Return the number of an address register, SP is A7."""
+    return 7 if name == 'SP' else int(name[1])
+
+
+def compile_program(lines, optimizations=()):
+    """Return the M68k code of this chapter for the assignment lines."""
+    file = io.StringIO()
+    code_proc = CodeProcessor(Scanner(''), optimizations=optimizations)
+    code_proc.set_m68k_code_output_file(file)
+    code_proc.test_assignment(lines)
+    code_proc.flush()
+    return file.getvalue()
+
+
+def interpret(lines, names):
+    """Return the values of the variables computed by chapter 04, by name."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'program.txt')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(f'{line}\n' for line in lines)
+            file.writelines(f'!{name}\n' for name in names)
+            file.write('.\n')
+        result = subprocess.run([sys.executable, 'cradle.py', path],
+                                cwd=CHAPTER_04, check=True,
+                                capture_output=True, text=True)
+    values = result.stdout.splitlines()[-len(names):] if names else []
+    return dict(zip(names, map(int, values)))
+
+
+def check(simulator, lines):
+    """
+    Compare the variables of a finished simulation with chapter 04.
+
+    Returns a list of (name, simulated, expected) tuples of the variables
+    with different values; the expected values are wrapped to the size of
+    the last store to the variable.
+    """
+    simulated = simulator.variables()
+    expected = interpret(lines, list(simulated))
+    return [(name, value, expected[name])
+            for (name, value) in simulated.items()
+            if to_signed(expected[name], simulator.stores[name]) != value]
+
+
+def check_optimizations(lines, optimizations=M68K_OPTIMIZATIONS):
+    """
+    Simulate the program with every combination of the optimizations.
+
+    The chapter 04 interpreter is run once for all combinations. Returns a
+    list of (combination, name, simulated, expected) tuples of the variables
+    with different values, see `check`.
+    """
+    simulators = {}
+    for count in range(len(optimizations) + 1):
+        for combination in itertools.combinations(optimizations, count):
+            code = compile_program(lines, combination)
+            simulators[combination] = M68kSimulator(code.splitlines()).run()
+    names = list(dict.fromkeys(name for simulator in simulators.values()
+                               for name in simulator.variables()))
+    expected = interpret(lines, names)
+    return [(combination, name, value, expected[name])
+            for (combination, simulator) in simulators.items()
+            for (name, value) in simulator.variables().items()
+            if to_signed(expected[name], simulator.stores[name]) != value]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('input', help='an assignment program')
+    parser.add_argument('--optimize', action='append', default=[],
+                        choices=M68K_OPTIMIZATIONS, metavar='NAME',
+                        help='apply an M68k optimization, can be repeated: '
+                        f"{', '.join(M68K_OPTIMIZATIONS)}")
+    parser.add_argument('--no-check', action='store_false', dest='check',
+                        help='do not compare with the chapter 04 interpreter')
+    parser.add_argument('--all-optimizations', action='store_true',
+                        help='check every combination of the optimizations')
+    args = parser.parse_args()
+    with open(args.input, encoding='utf-8') as file:
+        lines = [line.strip() for line in file if line.strip()]
+    if args.all_optimizations:
+        mismatches = check_optimizations(lines)
+        for (combination, name, value, expected) in mismatches:
+            print(f"{' '.join(combination) or 'no optimization'}: "
+                  f"{name} = {value}, expected {expected}")
+        print(f"{2 ** len(M68K_OPTIMIZATIONS)} combinations checked, "
+              f"{len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+    code = compile_program(lines, args.optimize)
+    simulator = M68kSimulator(code.splitlines()).run()
+    print(f"{simulator.instructions} instructions, {simulator.cycles} "
+          f"cycles, {simulator.reads} reads, {simulator.writes} writes")
+    if args.check:
+        mismatches = check(simulator, lines)
+        for (name, value, expected) in mismatches:
+            print(f"{name} = {value}, expected {expected}")
+        print(f"{len(simulator.variables()) - len(mismatches)} of "
+              f"{len(simulator.variables())} variables match chapter 04")
+        sys.exit(1 if mismatches else 0)
@@ -0,0 +1,207 @@
+"""
+Peephole optimization of the emitted M68k instruction stream.
+
+`Peephole` sits between a code generation backend and its `Emitter`: the
+instructions are kept in a small window, rewritten by the rules of a rule
+table, and passed on to the emitter when they leave the window. The parser
+and the backends are unchanged.
+
+A rule is a `Rule(name, pattern, rewrite)`. The pattern is a list of regular
+expressions, each matching one instruction (without comment, with the blanks
+after commas removed), or `ANY`, which matches any number of instructions not
+using the stack pointer. `rewrite` gets the named groups and the
+`(instruction, comment)` pairs of the matched instructions, and returns the
+new pairs. The rules are tried in table order, so more specific rules must
+come first. A match is only rewritten once the instructions following it
+are in the window too, so a higher priority rule overlapping it is seen
+first.
+
+The rules rely on an invariant of the stack code generator: D0 is always
+loaded again right after it has been pushed, so it is dead after a push.
+"""
+import re
+from collections import namedtuple
+
+Rule = namedtuple('Rule', ('name', 'pattern', 'rewrite'))
+
+ANY = None
+OPERAND = r'(?P<operand>#-?\d+|\w+\(PC\))'
+# Variables named like registers can only be addressed PC-relative.
+ABSOLUTE = r'(?P<name>(?!(?:[AD][0-7]|SP)\()\w+)'
+# Instructions loading D0 without popping the stack.
+LOAD = r'MOVE (?!\(SP\)\+)\S+,D0|BSR \w+|CLR D0'
+
+RULES = (
+    # 0 - term: CLR D0, push, term, SUB (SP)+,D0, NEG D0 negates the term.
+    # Only the implicit zero of a leading sign is loaded with CLR D0.
+    Rule('unary-minus',
+         [r'CLR D0', r'MOVE D0,-\(SP\)', LOAD, ANY, r'SUB \(SP\)\+,D0',
+          r'NEG D0'],
+         lambda groups, lines: lines[2:-2] + [('NEG D0',
+                                               'D0 = -D0 (negate)')]),
+    Rule('subtract-operand',
+         [r'MOVE D0,-\(SP\)', r'MOVE ' + OPERAND + r',D0', r'SUB \(SP\)\+,D0',
+          r'NEG D0'],
+         lambda groups, lines: [(f"SUB {groups['operand']},D0",
+                                 f"D0 -= {groups['operand']}")]),
+    Rule('add-operand',
+         [r'MOVE D0,-\(SP\)', r'MOVE ' + OPERAND + r',D0', r'ADD \(SP\)\+,D0'],
+         lambda groups, lines: [(f"ADD {groups['operand']},D0",
+                                 f"D0 += {groups['operand']}")]),
+    Rule('multiply-operand',
+         [r'MOVE D0,-\(SP\)', r'MOVE ' + OPERAND + r',D0',
+          r'MULS \(SP\)\+,D0'],
+         lambda groups, lines: [(f"MULS {groups['operand']},D0",
+                                 f"D0 *= {groups['operand']}")]),
+    Rule('push-operand',
+         [r'MOVE ' + OPERAND + r',D0', r'MOVE D0,-\(SP\)'],
+         lambda groups, lines: [(f"MOVE {groups['operand']},-(SP)",
+                                 f"push {groups['operand']}")]),
+    Rule('store',
+         [r'LEA ' + ABSOLUTE + r'\(PC\),A0', r'MOVE D0,\(A0\)'],
+         lambda groups, lines: [(f"MOVE D0,{groups['name']}",
+                                 f"{groups['name']} = D0")]),
+)
+
+
+def normalize(instruction):
+    """Return the instruction with the blanks after commas removed."""
+    return instruction.replace(', ', ',')
+
+
+class Peephole:
+    """
+    A window-based peephole optimizer in front of an `Emitter`.
+
+    Parameters
+    ----------
+        emitter (Emitter): The emitter the optimized code is written to.
+        rules (tuple): The rule table, see `RULES`.
+        window (int): Number of instructions kept for matching.
+
+    Attributes
+    ----------
+        hits (dict): Number of rewrites per rule name.
+        removed (int): Number of instructions removed by the rewrites.
+    """
+
+    WINDOW = 12
+
+    def __init__(self, emitter, rules=RULES, window=WINDOW):
+        self.emitter = emitter
+        self.window = window
+        self.lookahead = max(len([element for element in rule.pattern
+                                  if element is not ANY])
+                             for rule in rules) - 1
+        self.hits = dict.fromkeys((rule.name for rule in rules), 0)
+        self.removed = 0
+        # Every instruction is matched against each distinct regular
+        # expression once, when it enters the window; the patterns refer to
+        # the expressions by index.
+        expressions = list(dict.fromkeys(element for rule in rules
+                                         for element in rule.pattern
+                                         if element is not ANY))
+        self.__expressions = [re.compile(expression)
+                              for expression in expressions]
+        self.__rules = [Rule(rule.name,
+                             [element if element is ANY
+                              else expressions.index(element)
+                              for element in rule.pattern],
+                             rule.rewrite) for rule in rules]
+        self.__lines = []
+
+    def emit_ln(self, s, comment='', indent=1):
+        """Add an instruction to the window."""
+        self.__lines.append(self.__line(s, comment, indent))
+        if len(self.__lines) > self.window:
+            while self.__rewrite(len(self.__lines) - self.lookahead):
+                pass
+            self.emitter.emit_ln(*self.__lines.pop(0)[:3])
+
+    def flush(self):
+        """Pass the whole window on and write buffered code."""
+        while self.__rewrite(len(self.__lines)):
+            pass
+        for line in self.__lines:
+            self.emitter.emit_ln(*line[:3])
+        self.__lines.clear()
+        self.emitter.flush()
+
+    def close(self):
+        """Pass the whole window on and close the output file."""
+        self.flush()
+        self.emitter.close()
+
+    def __line(self, s, comment, indent):
+        """Return a window entry with the matches of the expressions."""
+        instruction = normalize(s)
+        return (s, comment, indent, 'SP' in instruction,
+                [expression.fullmatch(instruction)
+                 for expression in self.__expressions])
+
+    def __rewrite(self, limit):
+        """
+        Apply the first rule matching before `limit` to the window.
+
+        Matches reaching beyond `limit` are not applied yet, but block the
+        lower priority matches overlapping them.
+        """
+        blocked = []
+        lines = self.__lines
+        for rule in self.__rules:
+            first = rule.pattern[0]
+            for start in range(limit):
+                if first is not ANY and lines[start][4][first] is None:
+                    continue
+                match = self.__match(rule.pattern, start)
+                if match is None:
+                    continue
+                (end, groups, matched) = match
+                if any(start < block_end and block_start < end
+                       for (block_start, block_end) in blocked):
+                    continue
+                if end > limit:
+                    blocked.append((start, end))
+                    continue
+                replacement = [self.__line(s, comment, 1) for (s, comment)
+                               in rule.rewrite(groups, matched)]
+                self.removed += (end - start) - len(replacement)
+                lines[start:end] = replacement
+                self.hits[rule.name] += 1
+                return True
+        return False
+
+    def __match(self, pattern, start):
+        """Match the pattern at `start`, return (end, groups, lines)."""
+        lines = self.__lines
+        groups = {}
+        position = start
+        for (index, element) in enumerate(pattern):
+            if element is ANY:
+                # Match the rest of the pattern after as few instructions
+                # without stack access as possible.
+                while position < len(lines):
+                    found = self.__match(pattern[index + 1:], position)
+                    if found is not None:
+                        groups.update(found[1])
+                        return (found[0], groups,
+                                [line[:2] for line in lines[start:found[0]]])
+                    if lines[position][3]:
+                        return None
+                    position += 1
+                return None
+            if position >= len(lines):
+                return None
+            match = lines[position][4][element]
+            if match is None:
+                return None
+            groups.update(match.groupdict())
+            position += 1
+        return (position, groups,
+                [line[:2] for line in lines[start:position]])
+
+    def report(self):
+        """Return a one-line summary of the rule hits."""
+        hits = ', '.join(f'{name} {count}' for (name, count)
+                         in self.hits.items())
+        return f"Peephole: {hits}; {self.removed} instructions removed"
@@ -0,0 +1,175 @@
+"""
+Motorola 68000 code generation with register allocation.
+
+The stack backend pushes the primary register to memory before every
+operator and pops it back afterwards. This backend collects the parse actions
+of a statement into a syntax tree instead and generates code for it once
+the statement is complete. Temporaries live in the data registers D1-D7;
+the registers are assigned with Sethi-Ullman numbering, so the operand
+needing more registers is evaluated first, and values are only spilled to
+the stack when the registers run out.
+
+Right operands that are numbers or variables are used directly as source
+operands. D0 is a scratch register for operands `MULS`/`DIVS` cannot take
+directly and for function results; called functions are expected to preserve
+D1-D7. Divisions round down like in the other backends, see
+`backends.emit_floor_division`.
+"""
+from backends import emit_floor_division
+from syntax_tree import TreeBuilder, Number, Variable, Call, Zero, BinaryOp
+
+class RegisterM68kBackend(TreeBuilder):
+    """
+    Backend generating Motorola 68000 assembly code with register allocation.
+
+    Parameters
+    ----------
+        emitter (Emitter): The emitter the generated code is written to.
+        registers (tuple): The data registers available for temporaries.
+    """
+
+    REGISTERS = ('D1', 'D2', 'D3', 'D4', 'D5', 'D6', 'D7')
+
+    def __init__(self, emitter, registers=REGISTERS):
+        super().__init__()
+        self.emitter = emitter
+        self.registers = list(registers)
+        self.labels = 0
+        self.__needs = {}
+
+    def flush(self):
+        """Write buffered code to the output file."""
+        self.emitter.flush()
+
+    def close(self):
+        """Flush buffered code and close the output file."""
+        self.emitter.close()
+
+    def new_label(self, prefix):
+        """Return a new label starting with `prefix`."""
+        self.labels += 1
+        return f'{prefix}_{self.labels}'
+
+    def store_variable(self, name):
+        super().store_variable(name)
+        expression = self.program.statements.pop().expression
+        self.__needs = {}
+        self.generate(expression, self.registers)
+        register = self.registers[0]
+        self.emit_ln(f'LEA {name}(PC),A0', f'A0 = addr({name})')
+        self.emit_ln(f'MOVE.L {register},(A0)', f'{name} = {register}')
+
+    def need(self, node):
+        """Return the number of registers needed to evaluate the node."""
+        if not isinstance(node, BinaryOp):
+            return 1
+        spine = []
+        while isinstance(node, BinaryOp) and id(node) not in self.__needs:
+            spine.append(node)
+            node = node.left
+        count = self.__needs.get(id(node), 1)
+        for parent in reversed(spine):
+            right = 0 if self.source_operand(parent) else self.need(
+                parent.right)
+            count = count + 1 if count == right else max(count, right)
+            self.__needs[id(parent)] = count
+        return count
+
+    def source_operand(self, node):
+        """Return the right operand as a source operand, or None."""
+        match node.right:
+            case Number(): return f'#{node.right.value}'
+            case Zero(): return '#0'
+            case Variable(): return f'{node.right.name}(PC)'
+        return None
+
+    def generate(self, node, registers):
+        """Generate the code of an expression into `registers[0]`."""
+        target = registers[0]
+        spine = []
+        while isinstance(node, BinaryOp) and (
+                self.source_operand(node) is not None
+                or self.need(node.left) >= self.need(node.right)):
+            spine.append(node)
+            node = node.left
+        if isinstance(node, BinaryOp):
+            # The right operand needs more registers, evaluate it first.
+            if len(registers) > 1:
+                self.generate(node.right,
+                              [registers[1], target] + registers[2:])
+                self.generate(node.left, [target] + registers[2:])
+                self.operation(node.op, registers[1], target)
+            else:
+                self.generate(node.right, registers)
+                self.spill(target)
+                self.generate(node.left, registers)
+                self.emit_ln('MOVE.L (SP)+,D0',
+                             'D0 = (SP); increment SP (pop)')
+                self.operation(node.op, 'D0', target)
+        else:
+            self.load(node, target)
+        for parent in reversed(spine):
+            source = self.source_operand(parent)
+            if source is not None:
+                self.operation(parent.op, source, target)
+            elif len(registers) > 1:
+                self.generate(parent.right, registers[1:])
+                self.operation(parent.op, registers[1], target)
+            else:
+                self.spill(target)
+                self.generate(parent.right, registers)
+                self.emit_ln(f'MOVE.L {target},D0', f'D0 = {target}')
+                self.emit_ln(f'MOVE.L (SP)+,{target}',
+                             f'{target} = (SP); increment SP (pop)')
+                self.operation(parent.op, 'D0', target)
+
+    def spill(self, register):
+        """Push a register holding a temporary onto the stack."""
+        self.emit_ln(f'MOVE.L {register},-(SP)', f'push {register} (spill)')
+
+    def load(self, node, target):
+        """Load a leaf of the syntax tree into the target register."""
+        match node:
+            case Number():
+                if -128 <= int(node.value) <= 127:
+                    self.emit_ln(f'MOVEQ #{node.value},{target}',
+                                 f'{target} = {node.value}')
+                else:
+                    self.emit_ln(f'MOVE.L #{node.value},{target}',
+                                 f'{target} = {node.value}')
+            case Zero():
+                self.emit_ln(f'MOVEQ #0,{target}', f'{target} = 0')
+            case Variable():
+                self.emit_ln(f'MOVE.L {node.name}(PC),{target}',
+                             f'{target} = {node.name}')
+            case Call():
+                self.emit_ln(f'BSR {node.name}', f'call {node.name}()')
+                self.emit_ln(f'MOVE.L D0,{target}', f'{target} = D0')
+
+    def operation(self, op, source, target):
+        """Emit `target op= source`."""
+        if op in ('*', '/') and not is_word_operand(source):
+            # MULS and DIVS read a word operand, variables are longs.
+            self.emit_ln(f'MOVE.L {source},D0', f'D0 = {source}')
+            source = 'D0'
+        match op:
+            case '+':
+                self.emit_ln(f'ADD.L {source},{target}',
+                             f'{target} += {source}')
+            case '-':
+                self.emit_ln(f'SUB.L {source},{target}',
+                             f'{target} -= {source}')
+            case '*':
+                self.emit_ln(f'MULS {source},{target}',
+                             f'{target} *= {source}')
+            case '/':
+                emit_floor_division(self, source, target)
+                self.emit_ln(f'EXT.L {target}',
+                             'Sign-extend the quotient to 32 bits')
+
+
+def is_word_operand(operand):
+    """Return whether `MULS`/`DIVS` can read the operand as a word."""
+    if operand.startswith('#'):
+        return -0x8000 <= int(operand[1:]) <= 0x7fff
+    return len(operand) == 2 and operand[0] == 'D' and operand[1].isdigit()
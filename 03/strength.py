@@ -0,0 +1,82 @@
+"""
+Strength reduction of multiplications and divisions by constants.
+
+The helpers decide how a multiplication or a floor division by a literal is
+replaced by cheaper instructions; the backends then emit the sequence for
+their target:
+
+- Multiplication by 0, 1, a power of two, or a sum or difference of two
+  powers of two becomes shifts and an add/sub, negated for negative
+  constants. i32 multiplication wraps, so this is exact for every operand.
+- Floor division by a positive power of two is an arithmetic shift right,
+  which rounds to negative infinity for negative dividends as well.
+- Floor division by any other positive constant uses a multiply-high
+  "magic number": with `s = x >> 31` (all ones for negative x),
+  `floor(x / d) = ((x ^ s) * m >> shift) ^ s`, because `x ^ s` is `x` for
+  non-negative and `-x - 1` for negative dividends.
+
+Negative divisors keep the generic `@floor_div`.
+"""
+
+def log2_exact(value):
+    """Return k if value is 2**k, otherwise None."""
+    if value > 0 and value & (value - 1) == 0:
+        return value.bit_length() - 1
+    return None
+
+
+def multiply_plan(constant):
+    """
+    Return how to multiply by the i32 constant, or None for a plain multiply.
+
+    Returns
+    -------
+        tuple: One of ('zero',), ('copy', negate), ('shift', negate, k),
+        ('shift-add', negate, a, b) and ('shift-sub', negate, a, b), meaning
+        0, x, x << k, (x << a) + (x << b) and (x << a) - (x << b), negated
+        if `negate` is true.
+    """
+    if constant == 0:
+        return ('zero',)
+    negate = constant < 0
+    value = -constant if negate else constant
+    if value >= 0x80000000:
+        return None
+    if value == 1:
+        return ('copy', negate)
+    shift = log2_exact(value)
+    if shift is not None:
+        return ('shift', negate, shift)
+    low = value & -value
+    high = log2_exact(value - low)
+    if high is not None:
+        return ('shift-add', negate, high, low.bit_length() - 1)
+    high = log2_exact(value + low)
+    if high is not None and high < 32:
+        return ('shift-sub', negate, high, low.bit_length() - 1)
+    return None
+
+
+def divide_plan(divisor):
+    """
+    Return how to floor divide by the i32 divisor, or None for `@floor_div`.
+
+    Returns
+    -------
+        tuple: ('copy',) for 1, ('shift', k) for 2**k and
+        ('magic', multiplier, shift) for the multiply-high sequence on 64-bit
+        products.
+    """
+    if divisor < 1 or divisor >= 0x80000000:
+        return None
+    if divisor == 1:
+        return ('copy',)
+    shift = log2_exact(divisor)
+    if shift is not None:
+        return ('shift', shift)
+    # x ^ s < 2**31, so a 32-bit multiplier with the shift below is exact
+    # (Granlund and Montgomery, "Division by Invariant Integers using
+    # Multiplication").
+    shift = 31 + divisor.bit_length()
+    multiplier = -(-(1 << shift) // divisor)
+    return ('magic', multiplier, shift)
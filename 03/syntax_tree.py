@@ -0,0 +1,164 @@
+"""
+A compact syntax tree between parsing and code generation.
+
+The parser reports its parse actions to a `TreeBuilder`, which assembles
+the tree from them exactly like a stack machine: loads set the primary
+value, pushes save it on a stack, and operators combine the popped value with
+the primary one. The tree is then lowered to each code generation backend
+in a separate pass, replaying the same parse actions in the same order.
+
+The nodes use `__slots__`, so even programs with millions of nodes fit
+comfortably in memory.
+
+Classes
+-------
+- Number, Variable, Call, Zero, BinaryOp: Expression nodes.
+- Assignment, Program: Statement nodes.
+- TreeBuilder: A backend building the syntax tree from parse actions.
+"""
+from backends import Backend
+
+class Number:
+    """A decimal number literal, kept as the text of the source."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Variable:
+    """A reference to a variable."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Call:
+    """A call of a function without arguments."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Zero:
+    """The implicit zero a leading unary sign is applied to."""
+
+    __slots__ = ()
+
+
+class BinaryOp:
+    """A binary operation, `op` is one of '+', '-', '*' and '/'."""
+
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Assignment:
+    """An assignment of an expression to a variable."""
+
+    __slots__ = ('name', 'expression')
+
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+
+
+class Program:
+    """A list of assignment statements."""
+
+    __slots__ = ('statements',)
+
+    def __init__(self, statements=None):
+        self.statements = statements if statements is not None else []
+
+
+class TreeBuilder(Backend):
+    """A backend building the syntax tree of the parsed program."""
+
+    def __init__(self):
+        super().__init__(None)
+        self.program = Program()
+        self.__primary = None
+        self.__stack = []
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def load_number(self, num):
+        self.__primary = Number(num)
+
+    def load_variable(self, name):
+        self.__primary = Variable(name)
+
+    def call_function(self, name):
+        self.__primary = Call(name)
+
+    def clear(self):
+        self.__primary = Zero()
+
+    def push_factor(self):
+        self.__stack.append(self.__primary)
+
+    def push_term(self):
+        self.__stack.append(self.__primary)
+
+    def multiply(self):
+        self.__primary = BinaryOp('*', self.__stack.pop(), self.__primary)
+
+    def divide(self):
+        self.__primary = BinaryOp('/', self.__stack.pop(), self.__primary)
+
+    def add(self):
+        self.__primary = BinaryOp('+', self.__stack.pop(), self.__primary)
+
+    def subtract(self):
+        self.__primary = BinaryOp('-', self.__stack.pop(), self.__primary)
+
+    def store_variable(self, name):
+        self.program.statements.append(Assignment(name, self.__primary))
+
+
+def lower_expression(node, backend):
+    """Replay the parse actions of an expression tree to a backend."""
+    spine = []
+    while isinstance(node, BinaryOp):
+        spine.append(node)
+        node = node.left
+    match node:
+        case Number(): backend.load_number(node.value)
+        case Variable(): backend.load_variable(node.name)
+        case Call(): backend.call_function(node.name)
+        case Zero(): backend.clear()
+    for node in reversed(spine):
+        if node.op in ('*', '/'):
+            backend.push_factor()
+        else:
+            backend.push_term()
+        lower_expression(node.right, backend)
+        match node.op:
+            case '*': backend.multiply()
+            case '/': backend.divide()
+            case '+': backend.add()
+            case '-': backend.subtract()
+
+
+def lower_program(program, backend):
+    """Replay the parse actions of the test program to a backend."""
+    backend.begin_program()
+    for statement in program.statements:
+        lower_expression(statement.expression, backend)
+        backend.store_variable(statement.name)
+        backend.print_variable(statement.name)
+    backend.end_program()
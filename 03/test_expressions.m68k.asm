@@ -13,9 +13,18 @@
     MOVE A2(PC), D0                ; D0 = A2
     MOVE D0,-(SP)                  ; decrement SP; (SP)=D0 (push)
     MOVE A1(PC), D0                ; D0 = A1
-    MOVE (SP)+,D1                  ; D1 = (SP); increment SP (pop)
+    MOVE D0,D1                     ; D1 = D0 (divisor)
+    MOVE (SP)+,D0                  ; D0 = (SP); increment SP (pop)
     EXT.L D0                       ; Sign-extend the value in D0 to 32 bits
     DIVS D1,D0                     ; D0 /= D1 (signed division)
+    SWAP D0                        ; Remainder to the low word
+    TST D0                         ; Remainder zero?
+    BEQ FLOOR_1                    ; Exact quotient
+    EOR D1,D0                      ; Remainder and divisor signs differ?
+    BPL FLOOR_1                    ; Same signs, quotient rounded down
+    SUB.L #65536,D0                ; Decrement the quotient
+FLOOR_1:
+    SWAP D0                        ; Quotient to the low word
     LEA BB(PC),A0                  ; A0 = addr(BB)
     MOVE D0,(A0)                   ; BB = D0
     MOVE A2(PC), D0                ; D0 = A2
@@ -25,9 +34,18 @@
     MOVE A1(PC), D0                ; D0 = A1
     SUB (SP)+,D0                   ; D0 -= (SP); increment SP (pop)
     NEG D0                         ; D0 = -D0 (negate)
-    MOVE (SP)+,D1                  ; D1 = (SP); increment SP (pop)
+    MOVE D0,D1                     ; D1 = D0 (divisor)
+    MOVE (SP)+,D0                  ; D0 = (SP); increment SP (pop)
     EXT.L D0                       ; Sign-extend the value in D0 to 32 bits
     DIVS D1,D0                     ; D0 /= D1 (signed division)
+    SWAP D0                        ; Remainder to the low word
+    TST D0                         ; Remainder zero?
+    BEQ FLOOR_2                    ; Exact quotient
+    EOR D1,D0                      ; Remainder and divisor signs differ?
+    BPL FLOOR_2                    ; Same signs, quotient rounded down
+    SUB.L #65536,D0                ; Decrement the quotient
+FLOOR_2:
+    SWAP D0                        ; Quotient to the low word
     LEA BB2(PC),A0                 ; A0 = addr(BB2)
     MOVE D0,(A0)                   ; BB2 = D0
     MOVE BB(PC), D0                ; D0 = BB
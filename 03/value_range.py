@@ -0,0 +1,59 @@
+"""
+Value-range (interval) analysis of i32 values.
+
+A range is a tuple `(low, high)` of the smallest and largest value an
+operand can have at run time. Literals have exact ranges, the operations
+combine the ranges of their operands, and any result that could wrap around
+gets the full i32 range, so the ranges are always conservative.
+"""
+
+I32_MIN = -0x80000000
+I32_MAX = 0x7fffffff
+FULL_RANGE = (I32_MIN, I32_MAX)
+
+
+def wrap_i32(value):
+    """Wrap an integer around to a signed 32-bit value."""
+    return (value + 0x80000000) % 0x100000000 - 0x80000000
+
+
+def from_bounds(values):
+    """Return the range of the values, or the full range on overflow."""
+    low = min(values)
+    high = max(values)
+    if low < I32_MIN or high > I32_MAX:
+        return FULL_RANGE
+    return (low, high)
+
+
+def combine(op, left, right):
+    """Return the range of `left op right`, `op` is '+', '-', '*' or '/'."""
+    ((a, b), (c, d)) = (left, right)
+    match op:
+        case '+': return from_bounds((a + c, b + d))
+        case '-': return from_bounds((a - d, b - c))
+        case '*': return from_bounds((a * c, a * d, b * c, b * d))
+        case '/':
+            # Floor division is monotonic in both operands as long as the
+            # divisor keeps its sign.
+            if c <= 0 <= d:
+                return FULL_RANGE
+            return from_bounds((a // c, a // d, b // c, b // d))
+    return FULL_RANGE
+
+
+def same_sign(left, right):
+    """
+    Return 'udiv' or 'sdiv' if `left / right` needs no floor correction,
+    otherwise None.
+
+    Non-negative dividends with positive divisors can use `udiv`, non-positive
+    dividends with negative divisors have a non-negative quotient, so the
+    truncating `sdiv` rounds down as well.
+    """
+    ((a, b), (c, d)) = (left, right)
+    if a >= 0 and c > 0:
+        return 'udiv'
+    if b <= 0 and d < 0:
+        return 'sdiv'
+    return None
@@ -0,0 +1,268 @@
+"""
+Running an interpreter program over many input rows at once with NumPy.
+
+The direct interpreter runs a program once, with the `?` inputs taken from
+the source. `BatchProcessor` runs it for every row of a set of input
+columns instead: a `?name` input whose name is bound to a column reads the
+whole column, and every assignment is evaluated once, as array operations
+over all rows. A `?name` input without a column keeps its constant, which
+is broadcast to all rows. Every `!name` output collects a whole column.
+
+Unlike the direct interpreter, which computes with unbounded Python
+integers, the values are 32-bit integers: the results wrap around like the
+machine code of the compiler chapters, and `/` is floor division. A
+division by zero in any row is an error.
+
+Usage: python batch.py input [--column NAME=PATH ...] [--output PATH]
+
+The columns are read from `.npy` files, or from CSV files with one column
+or a header naming the variables. The outputs are written as CSV with a
+header (by default to stdout), as an `.npz` archive of columns, or as an
+`.npy` table with one column per output.
+"""
+import sys
+import argparse
+from scanner import Scanner
+from symbols import SymbolTable
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def require_numpy():
+    """Raise an ImportError if NumPy is not installed."""
+    if np is None:
+        raise ImportError("Batch mode requires NumPy, install it with "
+                          "'pip install numpy'.")
+
+
+def constant(value):
+    """Return a constant as an int32 scalar, wrapped around to 32 bits."""
+    return np.int32((value + 2**31) % 2**32 - 2**31)
+
+
+def load_column(path, name):
+    """
+    Read the input column of a variable from a file.
+
+    Parameters
+    ----------
+        path (str): An `.npy` file holding a one-dimensional integer array,
+            or a CSV file with a single column or a header row; the column
+            is selected from the header by the variable name.
+        name (str): The variable name, case-insensitive.
+
+    Returns
+    -------
+        The column as an int32 array, wrapped around to 32 bits.
+    """
+    require_numpy()
+    if path.endswith('.npy'):
+        column = np.load(path)
+        if column.ndim != 1 or column.dtype.kind not in 'iu':
+            raise ValueError(f"{path} is not a one-dimensional integer array.")
+        return column.astype(np.int32)
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+        fields = [field.strip() for field in first.split(',')]
+        if all(field.lstrip('+-').isdigit() for field in fields):
+            f.seek(0)
+            if len(fields) != 1:
+                raise ValueError(f"{path} has no header to select {name}.")
+            index = 0
+        else:
+            header = [field.upper() for field in fields]
+            if name.upper() not in header:
+                raise ValueError(f"{path} has no column {name}.")
+            index = header.index(name.upper())
+        column = np.loadtxt(f, dtype=np.int64, delimiter=',', usecols=index,
+                            ndmin=1)
+    return column.astype(np.int32)
+
+
+def column_names(outputs):
+    """Return unique column names for the outputs, numbering repeats."""
+    names = []
+    counts = {}
+    for (name, _) in outputs:
+        counts[name] = counts.get(name, 0) + 1
+        names.append(name if counts[name] == 1 else f'{name}_{counts[name]}')
+    return names
+
+
+def write_columns(path, outputs, rows):
+    """
+    Write the output columns of a batch run.
+
+    Parameters
+    ----------
+        path (str): The output file, `.npz`, `.npy` or CSV, or None for CSV
+            to stdout.
+        outputs (list): The (name, value) pairs of the `!` outputs; scalar
+            values are broadcast to all rows.
+        rows (int): The number of rows.
+    """
+    names = column_names(outputs)
+    columns = [np.broadcast_to(value, rows) for (_, value) in outputs]
+    if path is not None and path.endswith('.npz'):
+        np.savez(path, **dict(zip(names, columns)))
+        return
+    table = np.column_stack(columns) if columns else np.empty((rows, 0))
+    if path is not None and path.endswith('.npy'):
+        np.save(path, table.astype(np.int32))
+    elif path is None:
+        np.savetxt(sys.stdout, table, fmt='%d', delimiter=',',
+                   header=','.join(names), comments='')
+    else:
+        np.savetxt(path, table, fmt='%d', delimiter=',',
+                   header=','.join(names), comments='')
+
+
+class BatchProcessor:
+    """
+    An interpreter running a program over all rows of its input columns.
+
+    The parser follows `CodeProcessor`, but the values are int32 scalars or
+    arrays with one element per row, kept by slot in a `SymbolTable`.
+
+    Parameters
+    ----------
+        scanner (Scanner): A scanner instance used for parsing input data.
+        columns (dict): The input columns by upper-case variable name, all
+            of the same length.
+    """
+
+    def __init__(self, scanner, columns):
+        require_numpy()
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("The input columns differ in length.")
+        self.__scanner = scanner
+        self.__symbols = SymbolTable()
+        self.__values = self.__symbols.values
+        self.__columns = {self.__symbols[name]: column
+                          for (name, column) in columns.items()}
+        self.rows = lengths.pop() if lengths else 1
+        self.outputs = []
+
+    def slot(self):
+        """Get an Identifier and return its slot."""
+        return self.__scanner.get_slot(self.__symbols)
+
+    def factor(self):
+        """Parse and Translate a Math Factor."""
+        if self.__scanner.peek_char() == '(':
+            self.__scanner.match('(')
+            value = self.expression()
+            self.__scanner.match(')')
+        elif self.__scanner.is_peek_alpha():
+            value = self.__values[self.slot()]
+        else:
+            value = constant(self.__scanner.get_num())
+        return value
+
+    def divide(self, value):
+        """Recognize and Translate a Divide."""
+        self.__scanner.match('/')
+        divisor = self.factor()
+        zero = divisor == 0
+        if np.any(zero):
+            row = int(np.argmax(zero)) if np.ndim(zero) else 0
+            raise ZeroDivisionError(f"Division by zero in row {row}.")
+        return value // divisor
+
+    def term(self):
+        """Parse and Translate a Math Term."""
+        value = self.factor()
+        while self.__scanner.peek_char() in ('*', '/'):
+            match self.__scanner.peek_char():
+                case '*':
+                    self.__scanner.match('*')
+                    value = value * self.factor()
+                case '/':
+                    value = self.divide(value)
+                case _: self.__scanner.expected('Mulop')
+        return value
+
+    def expression(self):
+        """Parse and Translate an Expression."""
+        if self.__scanner.is_peek_addop():
+            value = constant(0)
+        else:
+            value = self.term()
+        while self.__scanner.is_peek_addop():
+            match self.__scanner.peek_char():
+                case '+':
+                    self.__scanner.match('+')
+                    value = value + self.term()
+                case '-':
+                    self.__scanner.match('-')
+                    value = value - self.term()
+                case _: self.__scanner.expected("Addop")
+        return value
+
+    def assignment(self):
+        """Parse and Translate an Assignment Statement."""
+        slot = self.slot()
+        self.__scanner.match('=')
+        self.__values[slot] = self.expression()
+
+    def __input(self):
+        """Input Routine."""
+        self.__scanner.match('?')
+        slot = self.slot()
+        value = constant(self.__scanner.get_num())
+        self.__values[slot] = self.__columns.get(slot, value)
+
+    def __output(self):
+        """Output Routine."""
+        self.__scanner.match('!')
+        slot = self.slot()
+        self.outputs.append((self.__symbols.name(slot), self.__values[slot]))
+
+    def interpreter(self):
+        """Run the program over all rows and return the outputs."""
+        # Overflow wraps around, as in int32 machine arithmetic.
+        with np.errstate(over='ignore'):
+            while self.__scanner.peek_char() != '.':
+                match self.__scanner.peek_char():
+                    case '?': self.__input()
+                    case '!': self.__output()
+                    case _: self.assignment()
+                self.__scanner.new_line()
+        return self.outputs
+
+
+def column_argument(text):
+    """Parse a NAME=PATH column argument."""
+    (name, separator, path) = text.partition('=')
+    if not separator or not name or not path:
+        raise argparse.ArgumentTypeError(f"expected NAME=PATH, got {text}")
+    return (name.upper(), path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('input', help="input source")
+    parser.add_argument('--column', type=column_argument, action='append',
+                        default=[], metavar='NAME=PATH',
+                        help="bind the `?` input of a variable to a column "
+                        "of a CSV or .npy file")
+    parser.add_argument('--output', default=None,
+                        help="write the output columns to a CSV, .npz or "
+                        ".npy file (default: CSV to stdout)")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("### Error: batch mode requires NumPy.")
+    with open(args.input, "r", encoding="utf-8") as f:
+        source = f.read()
+    columns = {name: load_column(path, name) for (name, path) in args.column}
+    processor = BatchProcessor(Scanner(source), columns)
+    try:
+        outputs = processor.interpreter()
+    except ZeroDivisionError as e:
+        print(f"### Error: {e}")
+        print("### Exiting program.")
+        sys.exit(1)
+    write_columns(args.output, outputs, processor.rows)
@@ -0,0 +1,95 @@
+"""
+Benchmark the direct interpreter against the compiling engines.
+
+The direct interpreter parses the generated program while it executes it.
+The bytecode and closure engines compile the program once and run the
+result; their compile and run times are reported separately, since a
+compiled program can be run again without parsing. As a lower bound, the
+program is also translated to a plain Python function. The printed output
+of all engines is compared for equality, first on a program of long
+operator chains with `--chain` terms each.
+
+Usage: python benchmark_interpreter.py [--lines N] [--repeat N] [--chain N]
+"""
+import io
+import sys
+import time
+import argparse
+from contextlib import redirect_stdout
+from corpus import generate_program
+from scanner import Scanner
+from code_processor import CodeProcessor
+from bytecode import BytecodeCompiler
+from closures import ClosureCompiler
+
+
+def timed(function):
+    """Call the function with stdout captured, return (seconds, output)."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+    return (elapsed, output.getvalue(), result)
+
+
+def python_function(lines):
+    """Translate a program to a plain Python function."""
+    body = []
+    for line in lines[:-1]:
+        if line.startswith('?'):
+            (name, value) = line[1:].split()
+            body.append(f'{name} = {value}')
+        elif line.startswith('!'):
+            body.append(f'print({line[1:]})')
+        else:
+            body.append(line.replace('/', '//'))
+    namespace = {}
+    exec('def program():\n    ' + '\n    '.join(body), namespace)
+    return namespace['program']
+
+
+def chain_program(terms):
+    """Return a program with chains of `terms` operands of each operator."""
+    return ['?A 3',
+            'B=' + '+'.join(['A'] * terms),
+            'C=' + '-'.join(['A*A'] * terms),
+            'D=' + '*'.join(['A'] * terms) + '/A' * terms,
+            '!B', '!C', '!D', '.']
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--chain', type=int, default=1000)
+    args = parser.parse_args()
+    chains = '\n'.join(chain_program(args.chain))
+    expected = timed(lambda: CodeProcessor(Scanner(chains)).interpreter())[1]
+    for (name, compiler) in (('bytecode', BytecodeCompiler),
+                             ('closures', ClosureCompiler)):
+        if timed(compiler(Scanner(chains)).compile().run)[1] != expected:
+            sys.exit(f"### Error: the output of {name} differs on chains.")
+    lines = generate_program(args.lines)
+    source = '\n'.join(lines)
+    print(f"{args.lines} statements, {len(source)} characters")
+
+    direct = min(timed(lambda: CodeProcessor(Scanner(source)).interpreter())
+                 for _ in range(args.repeat))
+    print(f"{'direct':>18}: {direct[0]:.3f} s")
+    for (name, compiler) in (('bytecode', BytecodeCompiler),
+                             ('closures', ClosureCompiler)):
+        compiled = min(timed(lambda: compiler(Scanner(source)).compile())
+                       for _ in range(args.repeat))
+        program = compiled[2]
+        run = min(timed(program.run) for _ in range(args.repeat))
+        if run[1] != direct[1]:
+            sys.exit(f"### Error: the output of {name} differs.")
+        print(f"{name + ' compile':>18}: {compiled[0]:.3f} s")
+        print(f"{name + ' run':>18}: {run[0]:.3f} s "
+              f"({direct[0] / run[0]:.2f}x speedup, compile + run "
+              f"{direct[0] / (compiled[0] + run[0]):.2f}x)")
+    native = min(timed(python_function(lines)) for _ in range(args.repeat))
+    if native[1] != direct[1]:
+        sys.exit("### Error: the output of the Python function differs.")
+    print(f"{'Python function':>18}: {native[0]:.3f} s")
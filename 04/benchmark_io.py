@@ -0,0 +1,75 @@
+"""
+Benchmark per-statement input and output against the bulk, buffered streams.
+
+The generated program is input and output heavy. It is run once with the
+`?` values as constants in the source and a `print` per `!` output, and once
+with the `?` values read from an `InputStream` and the `!` outputs collected
+in an `OutputBuffer`. The output goes to the null device, and the outputs of
+both runs are compared for equality.
+
+Usage: python benchmark_io.py [--lines N] [--repeat N]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+from contextlib import redirect_stdout
+from corpus import generate_program
+from scanner import TokenScanner
+from code_processor import CodeProcessor
+from streams import InputStream, OutputBuffer
+
+
+def split_inputs(lines):
+    """Move the constants of the `?` inputs to a separate stream of values."""
+    program = []
+    values = []
+    for line in lines:
+        if line.startswith('?'):
+            (line, value) = line.split()
+            values.append(value)
+        program.append(line)
+    return (program, '\n'.join(values).encode())
+
+
+def timed(function, file):
+    """Call the function with stdout redirected to a file, return seconds."""
+    with redirect_stdout(file):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    lines = generate_program(args.lines, inputs=0.45, outputs=0.45)
+    source = '\n'.join(lines)
+    (program, values) = split_inputs(lines)
+    stream_source = '\n'.join(program)
+    print(f"{args.lines} statements, {len(values)} bytes of input values")
+
+    def per_statement():
+        CodeProcessor(TokenScanner(source)).interpreter()
+
+    def streams():
+        with OutputBuffer(sys.stdout) as output:
+            processor = CodeProcessor(TokenScanner(stream_source),
+                                      InputStream(io.BytesIO(values)), output)
+            processor.interpreter()
+
+    for (name, function) in (('per statement', per_statement),
+                             ('streams', streams)):
+        output = io.StringIO()
+        timed(function, output)
+        if name == 'per statement':
+            expected = output.getvalue()
+        elif output.getvalue() != expected:
+            sys.exit(f"### Error: the output of {name} differs.")
+        with open(os.devnull, 'w', encoding='utf-8') as null:
+            elapsed = min(timed(function, null) for _ in range(args.repeat))
+        print(f"{name:>14}: {elapsed:.3f} s")
@@ -0,0 +1,203 @@
+"""
+Compiling interpreter programs to bytecode and running them on a small VM.
+
+The direct interpreter (`CodeProcessor.interpreter`) scans and parses the
+source while it executes and looks variables up by name. `BytecodeCompiler`
+parses the program once instead, with the same grammar, and produces a
+`Program`: the instructions in an `array('i')`, the constants, and the
+variable names, which are resolved to integer slots at compile time.
+`Program.run` executes the instructions on a stack machine with the values of
+the variables in a list indexed by slot.
+
+The instructions are an opcode, followed by an operand for `LOAD`, `STORE`,
+`CONST` and `PRINT`. The values are Python integers and `/` is floor
+division, as in the direct interpreter.
+"""
+from array import array
+from symbols import SymbolTable
+
+# Opcodes, ordered by how often they are executed.
+LOAD, CONST, STORE, ADD, SUB, MUL, DIV, PRINT, HALT = range(9)
+
+
+class Program:
+    """
+    A compiled interpreter program.
+
+    Parameters
+    ----------
+        code (array): The instructions, see the opcodes.
+        constants (list): The integer constants, by index.
+        names (list): The variable names, by slot.
+    """
+
+    def __init__(self, code, constants, names):
+        self.code = code
+        self.constants = constants
+        self.names = names
+
+    def run(self, values=None):
+        """
+        Execute the program and return the values of the variables by slot.
+
+        `values` are the initial values by slot, all variables are 0 by
+        default.
+        """
+        code = self.code
+        constants = self.constants
+        if values is None:
+            values = [0] * len(self.names)
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            op = code[pc]
+            if op == LOAD:
+                push(values[code[pc + 1]])
+                pc += 2
+            elif op == CONST:
+                push(constants[code[pc + 1]])
+                pc += 2
+            elif op == STORE:
+                values[code[pc + 1]] = pop()
+                pc += 2
+            elif op == ADD:
+                right = pop()
+                stack[-1] += right
+                pc += 1
+            elif op == SUB:
+                right = pop()
+                stack[-1] -= right
+                pc += 1
+            elif op == MUL:
+                right = pop()
+                stack[-1] *= right
+                pc += 1
+            elif op == DIV:
+                right = pop()
+                stack[-1] //= right
+                pc += 1
+            elif op == PRINT:
+                print(values[code[pc + 1]])
+                pc += 2
+            elif op == HALT:
+                return values
+            else:
+                raise ValueError(f"Unknown opcode {op} at {pc}")
+
+    def variables(self, values):
+        """Return the values by slot of `run` as a dict by name."""
+        return dict(zip(self.names, values))
+
+
+class BytecodeCompiler:
+    """
+    A compiler of interpreter programs to a `Program`.
+
+    The parser follows `CodeProcessor`, but emits instructions instead of
+    computing values.
+
+    Parameters
+    ----------
+        scanner (Scanner): A scanner instance used for parsing input data.
+    """
+
+    def __init__(self, scanner):
+        self.__scanner = scanner
+        self.__code = array('i')
+        self.__constants = []
+        self.__constant_index = {}
+        self.__symbols = SymbolTable()
+
+    def slot(self):
+        """Get an Identifier and return its slot."""
+        return self.__scanner.get_slot(self.__symbols)
+
+    def emit(self, op, operand=None):
+        """Append an instruction."""
+        self.__code.append(op)
+        if operand is not None:
+            self.__code.append(operand)
+
+    def constant(self, value):
+        """Emit pushing an integer constant."""
+        index = self.__constant_index.get(value)
+        if index is None:
+            index = self.__constant_index[value] = len(self.__constants)
+            self.__constants.append(value)
+        self.emit(CONST, index)
+
+    def factor(self):
+        """Parse and Translate a Math Factor."""
+        if self.__scanner.peek_char() == '(':
+            self.__scanner.match('(')
+            self.expression()
+            self.__scanner.match(')')
+        elif self.__scanner.is_peek_alpha():
+            self.emit(LOAD, self.slot())
+        else:
+            self.constant(self.__scanner.get_num())
+
+    def term(self):
+        """Parse and Translate a Math Term."""
+        self.factor()
+        while self.__scanner.peek_char() in ('*', '/'):
+            match self.__scanner.peek_char():
+                case '*':
+                    self.__scanner.match('*')
+                    self.factor()
+                    self.emit(MUL)
+                case '/':
+                    self.__scanner.match('/')
+                    self.factor()
+                    self.emit(DIV)
+                case _: self.__scanner.expected('Mulop')
+
+    def expression(self):
+        """Parse and Translate an Expression."""
+        if self.__scanner.is_peek_addop():
+            self.constant(0)
+        else:
+            self.term()
+        while self.__scanner.is_peek_addop():
+            match self.__scanner.peek_char():
+                case '+':
+                    self.__scanner.match('+')
+                    self.term()
+                    self.emit(ADD)
+                case '-':
+                    self.__scanner.match('-')
+                    self.term()
+                    self.emit(SUB)
+                case _: self.__scanner.expected("Addop")
+
+    def assignment(self):
+        """Parse and Translate an Assignment Statement."""
+        slot = self.slot()
+        self.__scanner.match('=')
+        self.expression()
+        self.emit(STORE, slot)
+
+    def __input(self):
+        """Input Routine."""
+        self.__scanner.match('?')
+        slot = self.slot()
+        self.constant(self.__scanner.get_num())
+        self.emit(STORE, slot)
+
+    def __output(self):
+        """Output Routine."""
+        self.__scanner.match('!')
+        self.emit(PRINT, self.slot())
+
+    def compile(self):
+        """Compile the program up to the final '.' and return it."""
+        while self.__scanner.peek_char() != '.':
+            match self.__scanner.peek_char():
+                case '?': self.__input()
+                case '!': self.__output()
+                case _: self.assignment()
+            self.__scanner.new_line()
+        self.emit(HALT)
+        return Program(self.__code, self.__constants, self.__symbols.names)
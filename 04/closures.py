@@ -0,0 +1,247 @@
+"""
+Compiling interpreter programs to trees of pre-bound Python closures.
+
+`ClosureCompiler` parses a program once, with the grammar of
+`CodeProcessor`, and turns every statement into a Python function of the
+list of variable values; the variables are resolved to slots of that list at
+compile time. Running the `ClosureProgram` is a loop calling these
+functions, without the scanner or any name lookup.
+
+While parsing, every operand is kept as a (kind, value) pair: a 'constant',
+a 'variable' slot, or a 'function' computing a subexpression. The closure of an
+operation is chosen by the kinds of its operands, so constants and variables
+are read directly instead of through another call, and operations on two
+constants are folded at compile time. A long chain of operations of the same
+precedence, like a thousand-term sum, becomes one closure looping over its
+operands, since calling a closure per operation nested that deep would
+exceed the recursion limit.
+"""
+import gc
+from operator import add, sub, mul, floordiv
+from symbols import SymbolTable
+
+# Chains of up to this many operations nest one closure per operation.
+CHAIN_LIMIT = 32
+
+
+def operation(op, left, right):
+    """Return the operand computing `left op right`."""
+    ((left_kind, a), (right_kind, b)) = (left, right)
+    match (left_kind, right_kind):
+        case ('constant', 'constant') if op is not floordiv or b != 0:
+            return ('constant', op(a, b))
+        case ('constant', 'variable'):
+            return ('function', lambda values: op(a, values[b]))
+        case ('constant', 'function'):
+            return ('function', lambda values: op(a, b(values)))
+        case ('variable', 'constant'):
+            return ('function', lambda values: op(values[a], b))
+        case ('variable', 'variable'):
+            return ('function', lambda values: op(values[a], values[b]))
+        case ('variable', 'function'):
+            return ('function', lambda values: op(values[a], b(values)))
+        case ('function', 'constant'):
+            return ('function', lambda values: op(a(values), b))
+        case ('function', 'variable'):
+            return ('function', lambda values: op(a(values), values[b]))
+        case ('function', 'function'):
+            return ('function', lambda values: op(a(values), b(values)))
+    # A constant division by zero fails when it is executed.
+    return ('function', lambda values: op(a, b))
+
+
+def step(op, operand):
+    """Return the function applying `op` to a result and an operand."""
+    (kind, b) = operand
+    match kind:
+        case 'constant':
+            return lambda result, values: op(result, b)
+        case 'variable':
+            return lambda result, values: op(result, values[b])
+        case _:
+            return lambda result, values: op(result, b(values))
+
+
+def chain(operand, operations):
+    """
+    Return the operand computing the operations from left to right.
+
+    Parameters
+    ----------
+        operand (tuple): The first operand.
+        operations (list): The (op, operand) pairs applied to it in order.
+    """
+    index = 0
+    while index < len(operations) and (operand[0] != 'function'
+                                       or len(operations) <= CHAIN_LIMIT):
+        (op, right) = operations[index]
+        operand = operation(op, operand, right)
+        index += 1
+    if index == len(operations):
+        return operand
+    # The rest of a long chain is a loop after the first function.
+    first = operand[1]
+    steps = [step(op, right) for (op, right) in operations[index:]]
+
+    def function(values):
+        result = first(values)
+        for apply in steps:
+            result = apply(result, values)
+        return result
+    return ('function', function)
+
+
+def assignment(slot, operand):
+    """Return the statement assigning an operand to a slot."""
+    (kind, value) = operand
+    match kind:
+        case 'constant':
+            def statement(values):
+                values[slot] = value
+        case 'variable':
+            def statement(values):
+                values[slot] = values[value]
+        case _:
+            def statement(values):
+                values[slot] = value(values)
+    return statement
+
+
+def output(slot):
+    """Return the statement printing a slot."""
+    def statement(values):
+        print(values[slot])
+    return statement
+
+
+class ClosureProgram:
+    """
+    A program compiled to closures.
+
+    Parameters
+    ----------
+        statements (list): The functions of the statements, each called with
+            the list of variable values.
+        names (list): The variable names, by slot.
+    """
+
+    def __init__(self, statements, names):
+        self.statements = statements
+        self.names = names
+
+    def run(self, values=None):
+        """
+        Execute the program and return the values of the variables by slot.
+
+        `values` are the initial values by slot, all variables are 0 by
+        default.
+        """
+        if values is None:
+            values = [0] * len(self.names)
+        for statement in self.statements:
+            statement(values)
+        return values
+
+    def variables(self, values):
+        """Return the values by slot of `run` as a dict by name."""
+        return dict(zip(self.names, values))
+
+
+class ClosureCompiler:
+    """
+    A compiler of interpreter programs to a `ClosureProgram`.
+
+    Parameters
+    ----------
+        scanner (Scanner): A scanner instance used for parsing input data.
+    """
+
+    def __init__(self, scanner):
+        self.__scanner = scanner
+        self.__statements = []
+        self.__symbols = SymbolTable()
+
+    def slot(self):
+        """Get an Identifier and return its slot."""
+        return self.__scanner.get_slot(self.__symbols)
+
+    def factor(self):
+        """Parse and Translate a Math Factor."""
+        if self.__scanner.peek_char() == '(':
+            self.__scanner.match('(')
+            operand = self.expression()
+            self.__scanner.match(')')
+        elif self.__scanner.is_peek_alpha():
+            operand = ('variable', self.slot())
+        else:
+            operand = ('constant', self.__scanner.get_num())
+        return operand
+
+    def term(self):
+        """Parse and Translate a Math Term."""
+        operand = self.factor()
+        operations = []
+        while self.__scanner.peek_char() in ('*', '/'):
+            match self.__scanner.peek_char():
+                case '*':
+                    self.__scanner.match('*')
+                    operations.append((mul, self.factor()))
+                case '/':
+                    self.__scanner.match('/')
+                    operations.append((floordiv, self.factor()))
+                case _: self.__scanner.expected('Mulop')
+        return chain(operand, operations)
+
+    def expression(self):
+        """Parse and Translate an Expression."""
+        if self.__scanner.is_peek_addop():
+            operand = ('constant', 0)
+        else:
+            operand = self.term()
+        operations = []
+        while self.__scanner.is_peek_addop():
+            match self.__scanner.peek_char():
+                case '+':
+                    self.__scanner.match('+')
+                    operations.append((add, self.term()))
+                case '-':
+                    self.__scanner.match('-')
+                    operations.append((sub, self.term()))
+                case _: self.__scanner.expected("Addop")
+        return chain(operand, operations)
+
+    def assignment(self):
+        """Parse and Translate an Assignment Statement."""
+        slot = self.slot()
+        self.__scanner.match('=')
+        self.__statements.append(assignment(slot, self.expression()))
+
+    def __input(self):
+        """Input Routine."""
+        self.__scanner.match('?')
+        slot = self.slot()
+        self.__statements.append(
+            assignment(slot, ('constant', self.__scanner.get_num())))
+
+    def __output(self):
+        """Output Routine."""
+        self.__scanner.match('!')
+        self.__statements.append(output(self.slot()))
+
+    def compile(self):
+        """Compile the program up to the final '.' and return it."""
+        # The closures form no reference cycles, but the many new objects
+        # trigger the cyclic garbage collector over and over.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            while self.__scanner.peek_char() != '.':
+                match self.__scanner.peek_char():
+                    case '?': self.__input()
+                    case '!': self.__output()
+                    case _: self.assignment()
+                self.__scanner.new_line()
+        finally:
+            if enabled:
+                gc.enable()
+        return ClosureProgram(self.__statements, self.__symbols.names)
@@ -1,4 +1,5 @@
 """Parsing input data and generating formatted code output."""
+from symbols import SymbolTable
 
 class CodeProcessor:
     """
@@ -14,11 +15,18 @@ class CodeProcessor:
     Parameters
     ----------
         scanner (Scanner): A scanner instance used for parsing input data.
+        input_stream (InputStream): Supplies the values of `?name` inputs
+            without a constant, or None to require a constant.
+        output (OutputBuffer): Collects the values of `!name` outputs, or
+            None to print them.
     """
 
-    def __init__(self, scanner):
+    def __init__(self, scanner, input_stream=None, output=None):
         self.__scanner = scanner
-        self.__table = dict()
+        self.__symbols = SymbolTable()
+        self.__values = self.__symbols.values
+        self.__input_stream = input_stream
+        self.__write = print if output is None else output.write
 
     def close(self):
         """Close output files."""
@@ -32,7 +40,7 @@ class CodeProcessor:
             value = self.expression()
             self.__scanner.match(')')
         elif self.__scanner.is_peek_alpha():
-            value = self.__table.get(self.__scanner.get_name(), 0)
+            value = self.__values[self.__scanner.get_slot(self.__symbols)]
         else:
             value = self.__scanner.get_num()
         return value
@@ -84,22 +92,27 @@ class CodeProcessor:
 
     def assignment(self):
         """Parse and Translate an Assignment Statement."""
-        name = self.__scanner.get_name()
+        slot = self.__scanner.get_slot(self.__symbols)
         self.__scanner.match('=')
-        self.__table[name] = self.expression()
+        self.__values[slot] = self.expression()
 
     def __input(self):
         """Input Routine."""
         self.__scanner.match('?')
-        name = self.__scanner.get_name()
-        value = self.__scanner.get_num()
-        self.__table[name] = value
+        slot = self.__scanner.get_slot(self.__symbols)
+        if self.__input_stream is None or self.__scanner.is_peek_digit():
+            self.__values[slot] = self.__scanner.get_num()
+        else:
+            self.__values[slot] = self.__input_stream.read()
 
     def __output(self):
         """Output Routine."""
         self.__scanner.match('!')
-        name = self.__scanner.get_name()
-        print(self.__table.get(name, 0))
+        self.__write(self.__values[self.__scanner.get_slot(self.__symbols)])
+
+    def variables(self):
+        """Return the values of the variables as a dict by name."""
+        return dict(zip(self.__symbols.names, self.__values))
 
     def interpreter(self):
         """Test Assignment."""
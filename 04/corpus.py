@@ -0,0 +1,52 @@
+"""Generating large, reproducible interpreter programs for benchmarks."""
+import random
+
+
+def generate_statement(rng, names):
+    """
+    Generate an assignment `x=(...)/d` over the given variable names.
+
+    The divisor is larger than the sum of the coefficients of the variables,
+    so the values stay small however long the program runs.
+    """
+    terms = []
+    total = 0
+    for _ in range(rng.randint(1, 4)):
+        coefficient = rng.randint(1, 9)
+        total += coefficient
+        name = rng.choice(names)
+        match rng.randrange(3):
+            case 0: term = f'{name}*{coefficient}'
+            case 1: term = f'{coefficient}*{name}'
+            case _: term = f'({name}+{rng.randint(0, 99)})*{coefficient}'
+        terms.append(term)
+    expression = terms[0]
+    for term in terms[1:]:
+        expression += f"{rng.choice('+-')}{term}"
+    if rng.random() < 0.1:
+        expression = f'-{expression}'
+    return f'({expression})/{total + rng.randint(1, 9)}'
+
+
+def generate_program(count, seed=0, variables=20, inputs=0.05, outputs=0.05):
+    """
+    Generate an interpreter program of `count` statements, one per line.
+
+    The program starts by reading every variable with `?`; afterwards a
+    fraction `inputs` of the statements are `?` inputs, `outputs` are `!`
+    outputs and the rest are assignments. The final line is '.'.
+    """
+    rng = random.Random(seed)
+    names = [f'v{i}' for i in range(variables)]
+    lines = [f'?{name} {rng.randint(0, 999)}' for name in names]
+    for _ in range(count):
+        choice = rng.random()
+        name = rng.choice(names)
+        if choice < inputs:
+            lines.append(f'?{name} {rng.randint(0, 999)}')
+        elif choice < inputs + outputs:
+            lines.append(f'!{name}')
+        else:
+            lines.append(f'{name}={generate_statement(rng, names)}')
+    lines.append('.')
+    return lines
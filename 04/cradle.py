@@ -13,8 +13,11 @@ Created on Sun Dec 15, 2024
 import sys
 import traceback
 import argparse
-from scanner import Scanner
+from scanner import Scanner, TokenScanner, ByteScanner
 from code_processor import CodeProcessor
+from bytecode import BytecodeCompiler
+from closures import ClosureCompiler
+from streams import InputStream, OutputBuffer
 
 def read_input(path):
     """
@@ -49,15 +52,60 @@ if __name__ == "__main__":
                                      "generates output for different targets.")
     parser.add_argument('input', type=str, nargs='?',
                         help='input source (default: user input)')
+    parser.add_argument('--scanner', choices=('char', 'token', 'byte'),
+                        default='char',
+                        help="scan the input character by character, tokenize "
+                        "it up front, or scan it as raw ASCII bytes "
+                        "(default: char)")
+    parser.add_argument('--engine', choices=('direct', 'bytecode', 'closures'),
+                        default='direct',
+                        help="interpret the source while parsing it, or "
+                        "compile it to bytecode or Python closures first and "
+                        "run that (default: direct)")
+    parser.add_argument('--values', type=str, default=None,
+                        help="read the values of `?name` inputs without a "
+                        "constant from a file, or '-' for stdin (direct "
+                        "engine only)")
+    parser.add_argument('--buffered', action='store_true',
+                        help="collect the `!name` outputs and write them in "
+                        "large blocks (direct engine only)")
     args = parser.parse_args()
+    if args.engine != 'direct' and (args.values is not None or args.buffered):
+        parser.error("--values and --buffered require --engine direct")
+    output = OutputBuffer(sys.stdout) if args.buffered else None
+    values_file = None
     try:
         input_data = read_input(args.input)
-        scanner = Scanner(input_data)
-        code_proc = CodeProcessor(scanner)
-        code_proc.interpreter()
+        if args.scanner == 'token':
+            scanner = TokenScanner(input_data)
+        elif args.scanner == 'byte':
+            scanner = ByteScanner(input_data)
+        else:
+            scanner = Scanner(input_data)
+        if args.engine == 'bytecode':
+            BytecodeCompiler(scanner).compile().run()
+        elif args.engine == 'closures':
+            ClosureCompiler(scanner).compile().run()
+        else:
+            if args.values == '-':
+                input_stream = InputStream(sys.stdin.buffer)
+            elif args.values is not None:
+                values_file = open(args.values, 'rb')
+                input_stream = InputStream(values_file)
+            else:
+                input_stream = None
+            code_proc = CodeProcessor(scanner, input_stream, output)
+            code_proc.interpreter()
     except Exception as e:
+        if output is not None:
+            output.flush()
         print(f"### Error: {e}")
         print("### Detailed traceback:")
         traceback.print_exc()
         print("### Exiting program.")
         sys.exit(1)
+    finally:
+        if output is not None:
+            output.flush()
+        if values_file is not None:
+            values_file.close()
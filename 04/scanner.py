@@ -1,5 +1,7 @@
 """Processing source code by reading it character by character."""
+import re
 import sys
+import string
 
 class Scanner:
     """
@@ -117,6 +119,17 @@ class Scanner:
         self.skip_white()
         return ''.join(token).upper()
 
+    def get_slot(self, symbols):
+        """Get an Identifier and return its slot in a `SymbolTable`."""
+        if not self.is_peek_alpha():
+            self.expected("Name", self.peek_char())
+        token = []
+        while self.is_peek_alphanum():
+            token.append(self.peek_char())
+            self.next_char()
+        self.skip_white()
+        return symbols[''.join(token)]
+
     def get_num(self):
         """Get a Number."""
         if not self.is_peek_digit():
@@ -134,3 +147,304 @@ class Scanner:
             self.next_char()
             if self.peek_char() == '\r':
                 self.next_char()
+
+
+class TokenScanner:
+    """
+    A scanner class that splits the input data into tokens up front.
+
+    The whole input is scanned in a single pass of a compiled regular
+    expression, producing (kind, text, position) tokens. The parser then walks
+    the token array using the same interface as `Scanner`, so `peek_char`
+    returns the first character of the current token and `get_name`/`get_num`
+    return a whole token at once. White space is dropped while tokenizing.
+
+    Parameters
+    ----------
+    input_data (str): The input data to be scanned.
+
+    Raises
+    ------
+    IndexError: If an attempt is made to read beyond the end of the input data.
+    """
+
+    TOKEN_PATTERN = re.compile(r'(?P<name>[^\W\d_][^\W_]*)|(?P<num>\d+)'
+                               r'|(?P<white>[ \t]+)|(?P<char>.)', re.DOTALL)
+
+    def __init__(self, input_data):
+        self.__tokens = [(m.lastgroup, m.group(), m.start())
+                         for m in self.TOKEN_PATTERN.finditer(input_data)
+                         if m.lastgroup != 'white']
+        self.__tokens.append((None, None, len(input_data)))
+        self.__token_pos = -1
+        self.next_char()
+
+    def tokens(self):
+        """Return the list of (kind, text, position) tokens."""
+        return self.__tokens
+
+    def peek_char(self):
+        """Return the current character or None if at the end of input."""
+        return self.__peek
+
+    def next_char(self):
+        """Read New Token From Input Stream."""
+        self.__token_pos += 1
+        if self.__token_pos >= len(self.__tokens):
+            raise IndexError("Attempted to read beyond the end of input data.")
+        (self.__kind, self.__text, _) = self.__tokens[self.__token_pos]
+        self.__peek = self.__text[0] if self.__text else None
+        return self.__peek
+
+    def error(self, s):
+        """Report an Error."""
+        position = self.__tokens[self.__token_pos][2]
+        print()
+        print(f"Error: {s}. Position in input: {position}")
+
+    def abort(self, message):
+        """Report Error and Halt."""
+        self.error(message)
+        sys.exit(1)
+
+    def expected(self, s, was=None):
+        """Report What Was Expected."""
+        message = f"{s} Expected"
+        if was:
+            message += f", but was: {was}"
+        self.abort(message)
+
+    def is_peek_alpha(self):
+        """Recognize an Alpha Character."""
+        return self.__kind == 'name'
+
+    def is_peek_digit(self):
+        """Recognize a Decimal Digit."""
+        return self.__kind == 'num'
+
+    def is_peek_alphanum(self):
+        """Recognize an Alphanumeric."""
+        return self.__kind in ('name', 'num')
+
+    def is_peek_addop(self):
+        """Recognize an Addop."""
+        return self.__peek in ('+', '-')
+
+    def is_peek_white(self):
+        """Recognize White Space."""
+        return False
+
+    def skip_white(self):
+        """Skip Over Leading White Space."""
+
+    def match(self, x):
+        """Match a Specific Input Character."""
+        if self.__peek != x:
+            self.expected(f"'{x}'", self.__peek)
+        else:
+            self.next_char()
+
+    def get_name(self):
+        """Get an Identifier."""
+        if self.__kind != 'name':
+            self.expected("Name", self.__peek)
+        name = self.__text.upper()
+        self.next_char()
+        return name
+
+    def get_slot(self, symbols):
+        """Get an Identifier and return its slot in a `SymbolTable`."""
+        if self.__kind != 'name':
+            self.expected("Name", self.__peek)
+        slot = symbols[self.__text]
+        self.next_char()
+        return slot
+
+    def get_num(self):
+        """Get a Number."""
+        if self.__kind != 'num':
+            self.expected("Integer", self.__peek)
+        value = int(self.__text)
+        self.next_char()
+        return value
+
+    def new_line(self):
+        """Recognize and Skip Over a Newline."""
+        if self.__peek == '\n':
+            self.next_char()
+            if self.__peek == '\r':
+                self.next_char()
+
+
+def char_class_table(classes):
+    """Build a 256-entry table of class bits from (bit, characters) pairs."""
+    table = bytearray(256)
+    for (bit, chars) in classes:
+        for c in chars:
+            table[ord(c)] |= bit
+    return bytes(table)
+
+
+class ByteScanner:
+    """
+    A scanner class for processing source code as raw ASCII bytes.
+
+    The scanner works directly on a `bytes`/`memoryview` of the input data and
+    classifies every byte with a single lookup in a precomputed 256-entry
+    character class table. Identifiers and numbers are sliced straight out of
+    the buffer. Only ASCII letters and digits are recognized, so every name
+    is a valid LLVM identifier.
+
+    Parameters
+    ----------
+    input_data (str, bytes, bytearray, memoryview or mmap): The input data to
+        be scanned. A `str` is encoded as UTF-8 first.
+
+    Raises
+    ------
+    IndexError: If an attempt is made to read beyond the end of the input data.
+    """
+
+    ALPHA = 0x01
+    DIGIT = 0x02
+    WHITE = 0x04
+    ADDOP = 0x08
+    MULOP = 0x10
+    ALPHANUM = ALPHA | DIGIT
+
+    CHAR_CLASS = char_class_table(((ALPHA, string.ascii_letters),
+                                   (DIGIT, string.digits),
+                                   (WHITE, ' \t'),
+                                   (ADDOP, '+-'),
+                                   (MULOP, '*/')))
+
+    CHARS = tuple(chr(c) for c in range(256))
+
+    def __init__(self, input_data):
+        if isinstance(input_data, str):
+            input_data = input_data.encode('utf-8')
+        self.__input_data = memoryview(input_data).cast('B')
+        self.__input_data_len = len(self.__input_data)
+        self.__input_data_pos = -1
+        self.next_char()
+        self.skip_white()
+
+    def peek_char(self):
+        """Return the current character or None if at the end of input."""
+        return self.__peek
+
+    def next_char(self):
+        """Read New Character From Input Stream."""
+        self.__input_data_pos += 1
+        pos = self.__input_data_pos
+        if pos < self.__input_data_len:
+            byte = self.__input_data[pos]
+            self.__peek = self.CHARS[byte]
+            self.__class = self.CHAR_CLASS[byte]
+        elif pos == self.__input_data_len:
+            self.__peek = None
+            self.__class = 0
+        else:
+            raise IndexError("Attempted to read beyond the end of input data.")
+        return self.__peek
+
+    def error(self, s):
+        """Report an Error."""
+        print()
+        print(f"Error: {s}. Position in input: {self.__input_data_pos}")
+
+    def abort(self, message):
+        """Report Error and Halt."""
+        self.error(message)
+        sys.exit(1)
+
+    def expected(self, s, was=None):
+        """Report What Was Expected."""
+        message = f"{s} Expected"
+        if was:
+            message += f", but was: {was}"
+        self.abort(message)
+
+    def is_peek_alpha(self):
+        """Recognize an Alpha Character."""
+        return self.__class & self.ALPHA != 0
+
+    def is_peek_digit(self):
+        """Recognize a Decimal Digit."""
+        return self.__class & self.DIGIT != 0
+
+    def is_peek_alphanum(self):
+        """Recognize an Alphanumeric."""
+        return self.__class & self.ALPHANUM != 0
+
+    def is_peek_addop(self):
+        """Recognize an Addop."""
+        return self.__class & self.ADDOP != 0
+
+    def is_peek_mulop(self):
+        """Recognize a Mulop."""
+        return self.__class & self.MULOP != 0
+
+    def is_peek_white(self):
+        """Recognize White Space."""
+        return self.__class & self.WHITE != 0
+
+    def skip_white(self):
+        """Skip Over Leading White Space."""
+        if self.__class & self.WHITE:
+            self.__skip(self.WHITE)
+
+    def __skip(self, char_class):
+        """Advance past all bytes of the given class, return the start."""
+        data = self.__input_data
+        table = self.CHAR_CLASS
+        start = pos = self.__input_data_pos
+        end = self.__input_data_len
+        while pos < end and table[data[pos]] & char_class:
+            pos += 1
+        self.__input_data_pos = pos - 1
+        self.next_char()
+        return start
+
+    def match(self, x):
+        """Match a Specific Input Character."""
+        if self.__peek != x:
+            self.expected(f"'{x}'", self.__peek)
+        else:
+            self.next_char()
+            self.skip_white()
+
+    def get_name(self):
+        """Get an Identifier."""
+        if not self.__class & self.ALPHA:
+            self.expected("Name", self.__peek)
+        start = self.__skip(self.ALPHANUM)
+        name = str(self.__input_data[start:self.__input_data_pos], 'ascii')
+        self.skip_white()
+        return name.upper()
+
+    def get_slot(self, symbols):
+        """Get an Identifier and return its slot in a `SymbolTable`."""
+        if not self.__class & self.ALPHA:
+            self.expected("Name", self.__peek)
+        start = self.__skip(self.ALPHANUM)
+        slot = symbols[
+            self.__input_data[start:self.__input_data_pos].tobytes()]
+        self.skip_white()
+        return slot
+
+    def get_num(self):
+        """Get a Number."""
+        if not self.__class & self.DIGIT:
+            self.expected("Integer", self.__peek)
+        start = self.__skip(self.DIGIT)
+        value = int(self.__input_data[start:self.__input_data_pos].tobytes())
+        self.skip_white()
+        return value
+
+    def new_line(self):
+        """Recognize and Skip Over a Newline."""
+        if self.__peek == '\n':
+            self.next_char()
+            if self.__peek == '\r':
+                self.next_char()
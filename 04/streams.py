@@ -0,0 +1,90 @@
+"""
+Bulk, buffered input and output for the interpreter.
+
+`InputStream` supplies the values of `?name` inputs that have no constant in
+the source. It reads a binary stream in large chunks and parses all
+whitespace-separated integers of a chunk at once, so a value costs a list
+index instead of a read. `OutputBuffer` collects the values of `!name`
+outputs and writes them, one per line, in large blocks instead of one
+`print` call per output.
+"""
+
+
+class InputStream:
+    """
+    A source of integer input values read in bulk.
+
+    Parameters
+    ----------
+        file (binary file): The stream to read from, e.g. `sys.stdin.buffer`.
+        chunk_size (int): The number of bytes read at a time.
+    """
+
+    def __init__(self, file, chunk_size=1 << 16):
+        self.__file = file
+        self.__chunk_size = chunk_size
+        self.__tail = b''
+        self.__values = []
+        self.__pos = 0
+
+    def __fill(self):
+        """Read and parse the next chunk holding at least one value."""
+        while True:
+            chunk = self.__file.read(self.__chunk_size)
+            data = self.__tail + chunk
+            fields = data.split()
+            # A number at the end of a chunk may continue in the next one.
+            if chunk and fields and not data[-1:].isspace():
+                self.__tail = fields.pop()
+            else:
+                self.__tail = b''
+            if fields:
+                self.__values = list(map(int, fields))
+                self.__pos = 0
+                return
+            if not chunk:
+                raise EOFError("No more input values.")
+
+    def read(self):
+        """Return the next input value."""
+        if self.__pos == len(self.__values):
+            self.__fill()
+        value = self.__values[self.__pos]
+        self.__pos += 1
+        return value
+
+
+class OutputBuffer:
+    """
+    A sink for output values, written in large blocks.
+
+    Parameters
+    ----------
+        file (text file): The stream to write to, e.g. `sys.stdout`.
+        lines (int): The number of values collected before a write.
+    """
+
+    def __init__(self, file, lines=1 << 13):
+        self.__file = file
+        self.__lines = lines
+        self.__buffer = []
+
+    def write(self, value):
+        """Append an output value, writing the buffer when it is full."""
+        self.__buffer.append(str(value))
+        if len(self.__buffer) >= self.__lines:
+            self.flush()
+
+    def flush(self):
+        """Write the collected values and flush the stream."""
+        if self.__buffer:
+            self.__buffer.append('')
+            self.__file.write('\n'.join(self.__buffer))
+            self.__buffer.clear()
+        self.__file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
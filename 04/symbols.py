@@ -0,0 +1,41 @@
+"""Interning identifiers to dense integer slots."""
+
+
+class SymbolTable(dict):
+    """
+    A symbol table giving every identifier a dense integer slot.
+
+    The table maps every spelling of an identifier, as it appears in the
+    source, to its slot; `symbols[spelling]` is a plain dictionary lookup, so
+    a repeated reference neither upper-cases nor builds a new name. Only a
+    new spelling is interned: identifiers are case-insensitive, and a new
+    variable gets the next slot. `names` and `values` are lists indexed by
+    slot; the names are kept for output and diagnostics.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.names = []
+        self.values = []
+
+    def __missing__(self, spelling):
+        """Intern a new spelling (str, or ASCII bytes) and return its slot."""
+        if isinstance(spelling, bytes):
+            name = str(spelling, 'ascii').upper()
+        else:
+            name = spelling.upper()
+        slot = self.get(name)
+        if slot is None:
+            slot = self[name] = len(self.names)
+            self.names.append(name)
+            self.values.append(0)
+        self[spelling] = slot
+        return slot
+
+    def slot(self, spelling):
+        """Return the slot of an identifier, allocating it on first use."""
+        return self[spelling]
+
+    def name(self, slot):
+        """Return the upper-case name of a slot."""
+        return self.names[slot]